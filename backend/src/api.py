@@ -1,17 +1,39 @@
 # api.py
-from fastapi import FastAPI, UploadFile, File, Form
+from fastapi import FastAPI, UploadFile, File, Form, Header, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from .utils import parse_key, parse_mode
-import shutil
-import tempfile 
+from .executor import (
+    run_inference, run_ocr, shutdown_executors, executor_stats,
+    prewarm_ocr_pool, OCR_PREWARM, OCR_WORKERS,
+)
+from .batching import predict_one, batching_stats
+from . import metrics
 import requests
 import os
 import json
+import hmac
+import csv
+import io
+import time
 import uvicorn  # <-- Added for direct execution
 import asyncio
+from typing import List
 
 
 app = FastAPI(title="Hit Predictor API")
+# Per-request lines are DEBUG and sampled (LOG_LEVEL / LOG_SAMPLE_RATE, see metrics)
+LOG = metrics.get_logger("API")
+
+# Upper bound on the number of rows accepted by /predict/batch in a single request
+MAX_BATCH_ROWS = int(os.getenv("MAX_BATCH_ROWS", 10000))
+# Upper bound on the grid size (product of the axis lengths) of one /predict/sweep request
+SWEEP_MAX_POINTS = int(os.getenv("SWEEP_MAX_POINTS", 10000))
+# Upper bound on the number of images accepted by /ocr/batch
+OCR_MAX_BATCH_FILES = int(os.getenv("OCR_MAX_BATCH_FILES", 50))
+
+# Shared secret for the /admin endpoints (X-Admin-Token header); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
 
 # Get the frontend URLs from environment variables, with defaults for local dev
 FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173") # Primary URL (Vite's default is 5173)
@@ -37,6 +59,55 @@ for domain in ["hit-predictor.vercel.app", "hit-predictor-git-ver-e81b2c-thithir
 origins = [origin for origin in origins if origin]
 origins = list(set(origins))
 
+# Room for the multipart boundaries and part headers around each uploaded image
+OCR_FORM_OVERHEAD = 64 * 1024
+
+def ocr_body_limit(path):
+    """Largest request body accepted by an OCR upload route, or None for other routes."""
+    from .ocr_extract import OCR_MAX_BYTES
+    if path == "/ocr":
+        return OCR_MAX_BYTES + OCR_FORM_OVERHEAD
+    if path == "/ocr/batch":
+        return OCR_MAX_BATCH_FILES * (OCR_MAX_BYTES + OCR_FORM_OVERHEAD)
+    return None
+
+class OCRBodyLimit:
+    """
+    Reject oversized OCR uploads before the multipart body is parsed, since the parser
+    spools every file (to a temp file past 1 MB) before the handler sees it. A declared
+    Content-Length over the limit is refused unread; a body without one is cut off as soon
+    as it passes the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = ocr_body_limit(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        detail = f"Upload exceeds {limit} bytes."
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+app.add_middleware(OCRBodyLimit)
+
 # Enable CORS for React frontend
 app.add_middleware(
     CORSMiddleware,
@@ -44,28 +115,141 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Cache", "Server-Timing"],
 )
 
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Request latency / count metrics, and a Server-Timing header with the stage timings."""
+    timings = metrics.start_request()
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    metrics.observe_request(route.path if route is not None else "unmatched", request.method,
+                            response.status_code, elapsed)
+    response.headers["Server-Timing"] = metrics.server_timing_header(timings, elapsed)
+    return response
+
 @app.on_event("startup")
 async def startup_event():
     """Kick off model loading in the background to avoid blocking port binding on Render."""
     try:
         # Import inside the background thread to avoid heavy imports on the main thread
         def warm_up():
-            from .model_manager import load_all_models_into_cache  # lazy import
+            from .model_manager import load_all_models_into_cache, start_model_watcher  # lazy import
             load_all_models_into_cache()
+            start_model_watcher()  # no-op unless MODEL_WATCH_INTERVAL is set
 
         # Run the expensive model cache warm-up in a background thread.
         asyncio.create_task(asyncio.to_thread(warm_up))
         print("[Startup] Triggered background model cache initialization.")
+        if OCR_PREWARM:
+            prewarm_ocr_pool()
+            print(f"[Startup] Pre-warming {OCR_WORKERS} OCR worker(s).")
     except Exception as e:
         # Don't fail startup if background warm-up can't be scheduled.
         print(f"[Startup] Warning: failed to schedule model cache init: {e}")
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the inference and OCR worker pools."""
+    shutdown_executors()
+
 @app.get("/health")
 def health():
+    """Liveness only: the process is up. Use /ready to know whether models can serve."""
     return {"ok": True}
 
+@app.get("/ready")
+def ready():
+    """
+    Readiness: 200 once the startup warm-up plan has finished, 503 before that.
+    Includes per-model load state and load / warm-up timings.
+    """
+    from .model_manager import get_readiness
+    status = get_readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition: stage and request latency histograms, counters, cache hit rates."""
+    from .model_manager import MODEL_CACHE, RESULT_CACHE
+    from .ocr_extract import get_ocr_cache
+    text = metrics.render_metrics(
+        caches={"model": MODEL_CACHE.stats(), "result": RESULT_CACHE.stats(), "ocr": get_ocr_cache().stats()},
+        batchers=batching_stats(),
+        executors=executor_stats(),
+    )
+    return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+@app.get("/stats")
+def stats():
+    """Worker pool queue depths, micro-batching distributions and model / result / OCR cache counters."""
+    from .model_manager import MODEL_CACHE, RESULT_CACHE
+    from .ocr_extract import get_ocr_cache
+    return {
+        "executors": executor_stats(),
+        "batching": batching_stats(),
+        "model_cache": MODEL_CACHE.stats(),
+        "result_cache": RESULT_CACHE.stats(),
+        "ocr_cache": get_ocr_cache().stats(),
+    }
+
+# Background reloads in flight; the event loop only keeps weak references to tasks
+RELOAD_TASKS = set()
+
+def _reload_done(task):
+    RELOAD_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        LOG.error("Background model reload failed: %r", task.exception())
+
+def require_admin(token):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them.")
+    if not token or not hmac.compare_digest(token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token.")
+
+@app.post("/admin/reload")
+async def admin_reload(model_id: str = Form(None), x_admin_token: str = Header(None)):
+    """
+    Hot-reload one model, or every model whose files changed on disk, in the background
+    (see model_manager.reload_model). Returns 202 with the model ids scheduled; poll
+    GET /admin/reload for the outcome. Only reaches the worker process that receives it;
+    with several workers use MODEL_WATCH_INTERVAL instead.
+    """
+    require_admin(x_admin_token)
+    from .model_manager import discover_models, check_for_updates, reload_model
+    if model_id:
+        if model_id not in await asyncio.to_thread(discover_models):
+            raise HTTPException(status_code=404, detail=f"Model id '{model_id}' not found.")
+        model_ids = [model_id]
+    else:
+        model_ids = await asyncio.to_thread(check_for_updates)
+
+    def reload_all():
+        for m in model_ids:
+            reload_model(m)
+
+    if model_ids:
+        task = asyncio.create_task(asyncio.to_thread(reload_all))
+        RELOAD_TASKS.add(task)
+        task.add_done_callback(_reload_done)
+    return JSONResponse({"scheduled": model_ids}, status_code=202)
+
+@app.get("/admin/reload")
+def admin_reload_status(x_admin_token: str = Header(None)):
+    """Last reload of each model and the artifact / manifest version each registered model serves."""
+    require_admin(x_admin_token)
+    from .model_manager import RELOAD_STATUS, MODEL_REGISTRY
+    return {
+        "reloads": RELOAD_STATUS,
+        "versions": {
+            model_id: {"version": entry["version"], "manifest_version": entry["manifest_version"]}
+            for model_id, entry in MODEL_REGISTRY.items()
+        },
+    }
+
 def normalize_features(feat):
     out = feat.copy()
     # Map key/mode from key_str if present
@@ -73,8 +257,9 @@ def normalize_features(feat):
         out["key"] = parse_key(out["key_str"])
         out["mode"] = parse_mode(out["key_str"])
     elif "key" in out and isinstance(out["key"], str) and not out["key"].isdigit():
-        out["key"] = parse_key(out["key"])
-        out["mode"] = parse_mode(out["key"])
+        key_str = out["key"]
+        out["key"] = parse_key(key_str)
+        out["mode"] = parse_mode(key_str)
     # If key is a digit, just keep it as int and set mode to default (1=Major)
     elif "key" in out and (isinstance(out["key"], int) or (isinstance(out["key"], str) and out["key"].isdigit())):
         out["key"] = int(out["key"])
@@ -83,8 +268,25 @@ def normalize_features(feat):
     
     # Ensure 'explicit' is an integer, not a string '0' or '1'
     if "explicit" in out:
-        out["explicit"] = int(out["explicit"])
+        try:
+            out["explicit"] = int(out["explicit"])
+        except (TypeError, ValueError):
+            raise ValueError(f"Feature 'explicit' must be 0 or 1, got {out['explicit']!r}.") from None
+
+    return out
 
+def normalize_rows(rows):
+    """
+    normalize_features and coerce_features for every row of a batch. A bad value is
+    rejected with a 400 naming its row, before it can reach a batched model call.
+    """
+    from .model_manager import coerce_features
+    out = []
+    for i, row in enumerate(rows):
+        try:
+            out.append(coerce_features(normalize_features(row)))
+        except (ValueError, TypeError) as e:
+            raise HTTPException(status_code=400, detail=f"Row {i}: {e}")
     return out
 
 @app.get("/models")
@@ -97,19 +299,7 @@ def list_models():
     models = get_available_models()
     return {"models": models}
 
-@app.post("/ocr")
-async def ocr(file: UploadFile = File(...)):
-    # Lazy import to avoid heavy easyocr/torch import at startup
-    from .ocr_extract import extract_features_from_image
-    tmpdir = tempfile.mkdtemp()
-    # Use a default filename if one is not provided (e.g., from a paste event)
-    filename = file.filename or "pasted_image.png"
-    tmp_path = os.path.join(tmpdir, filename)
-    with open(tmp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    features = extract_features_from_image(tmp_path)
-    print("[API] OCR extracted features:", features) # Debug
-
+def normalize_ocr_features(features):
     # Normalize percentage values from OCR (0-100 -> 0-1) and map happiness to valence
     normalized_features = features.copy()
     for key in ['danceability', 'energy', 'happiness', 'acousticness', 'instrumentalness', 'liveness', 'speechiness']:
@@ -122,9 +312,98 @@ async def ocr(file: UploadFile = File(...)):
     elif 'valence' in normalized_features and normalized_features['valence'] > 1:
         # Also normalize valence if it exists and is on a 0-100 scale
         normalized_features['valence'] /= 100.0
+    return normalized_features
+
+async def cached_ocr(content):
+    """OCR encoded image bytes through the content-hash cache; returns (features, cache_hit)."""
+    from .ocr_extract import extract_features_timed, get_ocr_cache, image_cache_key
+    cache = get_ocr_cache()
+    if cache.enabled:
+        start = time.perf_counter()
+        key = image_cache_key(content)
+        metrics.record("ocr_cache_key", time.perf_counter() - start)
+        features = cache.get(key)
+        if features is not None:
+            return dict(features), True
+    # Stage timings come back from the OCR worker process with its result
+    features, timings = await run_ocr(extract_features_timed, content)
+    metrics.add_timings(timings, observe_histograms=True)
+    if cache.enabled:
+        cache.set(key, features, namespace="ocr")
+    return dict(features), False
+
+@app.post("/ocr")
+async def ocr(response: Response, file: UploadFile = File(...)):
+    # Lazy import; easyocr/torch are only imported inside the OCR worker processes
+    from .ocr_extract import check_image_limits, ImageTooLargeError, OCR_MAX_BYTES
+    # OCRBodyLimit already bounds the request body; this catches an image that is over the
+    # limit on its own
+    content = await file.read(OCR_MAX_BYTES + 1)
+    try:
+        check_image_limits(content)
+    except ImageTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    # The image bytes are passed to the OCR worker in memory
+    features, cache_hit = await cached_ocr(content)
+    response.headers["X-Cache"] = "HIT" if cache_hit else "MISS"
+    metrics.sampled_debug(LOG, "OCR extracted features: %s", features)
+    with metrics.timed("normalize"):
+        normalized_features = normalize_ocr_features(features)
     return {"features": normalized_features}
 
+@app.post("/ocr/batch")
+async def ocr_batch(files: List[UploadFile] = File(...), stream: bool = Form(False)):
+    """
+    OCR many screenshots in one request on the pre-warmed OCR worker pool.
+    Returns one entry per file in upload order, or with stream=true an NDJSON stream
+    with one line per image as soon as it finishes (each line carries its `index`).
+    """
+    from .ocr_extract import check_image_limits, OCR_MAX_BYTES
+    if len(files) > OCR_MAX_BATCH_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {OCR_MAX_BATCH_FILES} images per batch.")
+
+    uploads = []
+    for file in files:
+        content = await file.read(OCR_MAX_BYTES + 1)
+        try:
+            check_image_limits(content)
+            uploads.append((file.filename, content, None))
+        except ValueError as e:
+            uploads.append((file.filename, None, str(e)))
+
+    # One batch never holds more OCR queue slots than there are workers
+    slots = asyncio.Semaphore(OCR_WORKERS)
+
+    async def process(index, filename, content, error):
+        result = {"index": index, "filename": filename}
+        if error is not None:
+            result["error"] = error
+            return result
+        try:
+            async with slots:
+                features, cache_hit = await cached_ocr(content)
+            with metrics.timed("normalize"):
+                result["features"] = normalize_ocr_features(features)
+            result["cache"] = "hit" if cache_hit else "miss"
+        except HTTPException as e:
+            result["error"] = e.detail
+        except Exception as e:
+            result["error"] = str(e)
+        return result
+
+    tasks = [asyncio.ensure_future(process(i, *upload)) for i, upload in enumerate(uploads)]
+    if not stream:
+        return {"results": await asyncio.gather(*tasks)}
+
+    async def ndjson():
+        for next_done in asyncio.as_completed(tasks):
+            yield json.dumps(await next_done) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @app.post("/predict")
 async def predict(model_id: str = Form(...), features: str = Form(...)):
     """
@@ -133,33 +412,259 @@ async def predict(model_id: str = Form(...), features: str = Form(...)):
     try:
         features_dict = json.loads(features)
     except Exception as e:
-        print("Failed to parse features JSON:", features)
+        LOG.warning("Failed to parse features JSON: %.200s", features)
         raise
 
-    print(f"[API] Received model_id: {model_id}")
-    print(f"[API] Received features_dict: {features_dict}")
-
     # Normalize key/mode
-    features_dict = normalize_features(features_dict)
-    print(f"[API] Normalized features_dict: {features_dict}")
+    with metrics.timed("normalize"):
+        normalized = normalize_features(features_dict)
 
-    # We need the original model file path for the label encoder, not the cached object.
-    from .model_manager import discover_models, predict_from_features_dict
-    discovered_models = discover_models("models")
-    model_file_path = discovered_models.get(model_id)
+    from .model_manager import get_model_entry, coerce_features
+    if get_model_entry(model_id) is None:
+        LOG.warning("Model id '%s' not found in model registry.", model_id)
+        raise HTTPException(status_code=404, detail=f"Model id '{model_id}' not found.")
+    # Reject bad values here so they never reach a micro-batch shared with other requests
+    try:
+        normalized = coerce_features(normalized)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if not model_file_path:
-        print(f"Model id '{model_id}' not found in discovered models: {list(discovered_models.keys())}")
-        raise ValueError(f"Model id '{model_id}' not found.")
+    # Concurrent requests for the same model are coalesced into one batched call
+    try:
+        result = await predict_one(normalized, model_id)
+    except (ValueError, TypeError) as e:
+        # Only this request's row failed; rows batched with it were scored on their own
+        raise HTTPException(status_code=400, detail=f"Invalid features: {e}")
+    metrics.sampled_debug(LOG, "Predict model_id=%s features=%s normalized=%s result=%s",
+                          model_id, features_dict, normalized, result)
+    return {"prediction": result}
 
-    result = predict_from_features_dict(features_dict, model_id, model_file_path)
-    print(f"[API] Prediction result: {result}")
+def _coerce_value(value):
+    """Convert a CSV cell to int/float when it looks numeric; keep strings like 'C# Major' as-is."""
+    if not isinstance(value, str):
+        return value
+    value = value.strip()
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
 
-    # If regression, print popularity score directly for clarity
-    if "predicted_popularity" in result:
-        print(f"[API] Predicted popularity score: {result['predicted_popularity']}")
+def parse_batch_rows(features=None, content=None, filename=None):
+    """
+    Turn a /predict/batch payload into a list of feature dicts.
+    Accepts a JSON array of feature objects, or an uploaded CSV / JSON Lines file.
+    """
+    if features:
+        rows = json.loads(features)
+        if isinstance(rows, dict):
+            rows = rows.get("rows", [])
+    elif content is not None:
+        text = content.decode("utf-8-sig")
+        name = (filename or "").lower()
+        if name.endswith((".jsonl", ".ndjson", ".json")):
+            stripped = text.lstrip()
+            if stripped.startswith("["):
+                rows = json.loads(stripped)
+            else:
+                rows = [json.loads(line) for line in text.splitlines() if line.strip()]
+        else:
+            # Default to CSV with a header row; empty cells are treated as missing features
+            reader = csv.DictReader(io.StringIO(text))
+            rows = [
+                {k.strip(): _coerce_value(v) for k, v in row.items() if k and v not in (None, "")}
+                for row in reader
+            ]
+    else:
+        rows = []
 
-    return {"prediction": result}
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ValueError("Batch payload must be a list of feature objects.")
+    return rows
+
+@app.post("/predict/batch")
+async def predict_batch(
+    model_id: str = Form(...),
+    features: str = Form(None),
+    file: UploadFile = File(None),
+):
+    """
+    Run prediction for many tracks in one request.
+    Send either `features` (a JSON array of feature objects) or `file` (CSV or JSON Lines).
+    Predictions are returned in the same order as the input rows.
+    """
+    content = await file.read() if file is not None else None
+    try:
+        rows = parse_batch_rows(features, content, file.filename if file is not None else None)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid batch payload: {e}")
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="No feature rows provided.")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ROWS} rows.")
+
+    metrics.sampled_debug(LOG, "Batch prediction: model_id=%s, rows=%d", model_id, len(rows))
+    from .model_manager import get_model_entry, predict_batch as run_predict_batch
+    if get_model_entry(model_id) is None:
+        raise HTTPException(status_code=404, detail=f"Model id '{model_id}' not found.")
+    with metrics.timed("normalize"):
+        rows = normalize_rows(rows)
+
+    try:
+        results = await run_inference(run_predict_batch, rows, model_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid features: {e}")
+    return {"predictions": results, "count": len(results)}
+
+@app.post("/predict/all")
+async def predict_all(features: str = Form(...), model_ids: str = Form(None)):
+    """
+    Score one feature set (a JSON object) or a batch (a JSON array) with every registered
+    model in one request, or only the comma-separated `model_ids` when given.
+    Rows are transformed once per distinct preprocessor and the models then run concurrently
+    on the inference pool. Each model's entry reports its own scoring latency and how many
+    rows came from the result cache.
+    """
+    try:
+        payload = json.loads(features)
+        single = isinstance(payload, dict) and "rows" not in payload
+        rows = [payload] if single else parse_batch_rows(features)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid features payload: {e}")
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="No feature rows provided.")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ROWS} rows.")
+
+    from .model_manager import (
+        get_available_models, get_model_entry,
+        prepare_batch_many, score_prepared_timed, finish_prepared,
+    )
+    if model_ids:
+        ids = list(dict.fromkeys(m.strip() for m in model_ids.split(",") if m.strip()))
+        unknown = [m for m in ids if get_model_entry(m) is None]
+        if unknown:
+            raise HTTPException(status_code=404, detail=f"Model id(s) not found: {', '.join(unknown)}")
+    else:
+        ids = [m["id"] for m in get_available_models()]
+    with metrics.timed("normalize"):
+        rows = normalize_rows(rows)
+    metrics.sampled_debug(LOG, "Predict all: models=%s, rows=%d", ids, len(rows))
+
+    start = time.perf_counter()
+    # Cache lookups, model loads and the shared transforms, then one scoring job per model
+    try:
+        plan = await run_inference(prepare_batch_many, rows, ids)
+        cached_rows = {m: len(rows) - len(plan["models"][m]["missing"]) for m in ids}
+        latencies = await asyncio.gather(*(run_inference(score_prepared_timed, plan, m) for m in ids))
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid features: {e}")
+    results = finish_prepared(plan)
+
+    models = {}
+    for model_id, seconds in zip(ids, latencies):
+        entry = get_model_entry(model_id)
+        models[model_id] = {
+            "task": entry["task"],
+            "latency_ms": round(seconds * 1000, 3),
+            "cached_rows": cached_rows[model_id],
+        }
+        if single:
+            models[model_id]["prediction"] = results[model_id][0]
+        else:
+            models[model_id]["predictions"] = results[model_id]
+    return {
+        "models": models,
+        "count": len(rows),
+        "transform_ms": round(sum(plan["transform_seconds"].values()) * 1000, 3),
+        "total_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+@app.post("/predict/sweep")
+async def predict_sweep(model_id: str = Form(...), features: str = Form(...), axes: str = Form(...)):
+    """
+    What-if response surface: score one feature set (a JSON object) over a grid of one or
+    two of its features, e.g. axes=[{"feature": "tempo", "start": 60, "stop": 200, "steps": 71},
+    {"feature": "energy", "start": 0, "stop": 1, "steps": 21}]. An axis may list explicit
+    "values" instead (e.g. every key). The whole grid is transformed and scored in one call.
+    `surface` holds each output column as a list over the first axis (of lists over the second).
+    """
+    from .model_manager import get_model_entry, sweep_values, predict_sweep as run_predict_sweep
+    try:
+        base = json.loads(features)
+        spec = json.loads(axes)
+        spec = [spec] if isinstance(spec, dict) else spec
+        if not isinstance(base, dict):
+            raise ValueError("features must be a JSON object.")
+        if not isinstance(spec, list) or not 1 <= len(spec) <= 2:
+            raise ValueError("axes must list one or two features.")
+        grid = [(axis["feature"], sweep_values(axis, max_steps=SWEEP_MAX_POINTS)) for axis in spec]
+        if len({feature for feature, _ in grid}) != len(grid):
+            raise ValueError("each feature can only be swept once.")
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sweep: {e}")
+
+    points = 1
+    for _, values in grid:
+        points *= len(values)
+    if points > SWEEP_MAX_POINTS:
+        raise HTTPException(status_code=413, detail=f"Sweep exceeds {SWEEP_MAX_POINTS} points.")
+    with metrics.timed("normalize"):
+        base = normalize_features(base)
+    if get_model_entry(model_id) is None:
+        raise HTTPException(status_code=404, detail=f"Model id '{model_id}' not found.")
+    metrics.sampled_debug(LOG, "Sweep: model_id=%s, axes=%s, points=%d", model_id, [f for f, _ in grid], points)
+
+    try:
+        result = await run_inference(run_predict_sweep, base, grid, model_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid sweep: {e}")
+    return dict(result, model_id=model_id, count=points)
+
+@app.post("/explain")
+async def explain(model_id: str = Form(...), features: str = Form(...)):
+    """
+    Why a track scored as it did: per-feature contributions for one feature set (a JSON
+    object) or a batch (a JSON array) from a tree model (XGBoost or Random Forest).
+    Each explanation has the prediction, the model's base value and one contribution per
+    input feature (one-hot key columns are summed into "key"), largest first; base value
+    plus contributions gives the prediction in `output` units (popularity, log-odds for
+    the XGBoost classifier, hit probability for the Random Forest classifier).
+    """
+    try:
+        payload = json.loads(features)
+        single = isinstance(payload, dict) and "rows" not in payload
+        rows = [payload] if single else parse_batch_rows(features)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid features payload: {e}")
+
+    if not rows:
+        raise HTTPException(status_code=400, detail="No feature rows provided.")
+    if len(rows) > MAX_BATCH_ROWS:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_ROWS} rows.")
+
+    from .model_manager import get_model_entry, explain_batch
+    from .explain import supports_explanations
+    if get_model_entry(model_id) is None:
+        raise HTTPException(status_code=404, detail=f"Model id '{model_id}' not found.")
+    if not supports_explanations(model_id):
+        raise HTTPException(status_code=400, detail=f"Explanations are only available for tree models, not '{model_id}'.")
+    with metrics.timed("normalize"):
+        rows = normalize_rows(rows)
+    metrics.sampled_debug(LOG, "Explain: model_id=%s, rows=%d", model_id, len(rows))
+
+    try:
+        results = await run_inference(explain_batch, rows, model_id)
+    except (ValueError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid features: {e}")
+    if single:
+        return {"explanation": results[0]}
+    return {"explanations": results, "count": len(results)}
 
 # Add this section to make the script directly runnable
 if __name__ == "__main__":
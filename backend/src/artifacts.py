@@ -0,0 +1,565 @@
+# backend/src/artifacts.py
+"""
+Memory-mapped model artifacts, shared read-only by every worker process through the page cache.
+`convert` writes a `<artifact>.mmap` file next to each model, preprocessor and label encoder
+under models/ (and next to each DenseNet .npz). It is an uncompressed joblib dump whose NumPy
+arrays are loaded with joblib.load(mmap_mode="r") instead of being copied into each process.
+
+sklearn forests copy their node arrays into private memory when unpickled, mmap or not, so a
+forest is stored as flat arrays instead (children, split feature, threshold and leaf values of
+all trees) and served by ForestArrays, a NumPy traversal that reads them in place and gives
+the same predictions as sklearn. XGBoost keeps its trees in native memory, so XGBoost models
+cannot be shared this way and are left as they are.
+
+A .mmap file older than its source artifact is ignored, and ARTIFACT_MMAP=0 turns the
+mapped loading off.
+
+Most models are trained on the same fitted preprocessor, so preprocessors are kept once each
+in models/preprocessors/<fingerprint>.joblib (see preprocessing.preprocessor_fingerprint).
+index.json maps every model's preprocessor path to its fingerprint; `dedupe` moves existing
+per-model preprocessor files into the store.
+
+Every model directory has a manifest.json listing the sha256 and size of its artifacts and
+of the stored preprocessors its models use, with a version number that goes up whenever one
+of them changes. Training scripts rewrite it when they finish; the server uses it to detect
+new model versions and to check that a copy is complete before hot-reloading it
+(see model_manager.reload_model).
+
+Usage (run from the backend directory):
+    python -m src.artifacts convert [models_dir]
+    python -m src.artifacts report [model_id ...]
+    python -m src.artifacts dedupe [--prune] [models_dir]
+    python -m src.artifacts manifest [models_dir]
+"""
+import os
+import sys
+import json
+import glob
+import shutil
+import hashlib
+import joblib
+import numpy as np
+from datetime import datetime, timezone
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", "models"))
+
+ARTIFACT_MMAP = os.getenv("ARTIFACT_MMAP", "1") != "0"
+MMAP_SUFFIX = ".mmap"
+FOREST_FORMAT = "forest-arrays-v1"
+# Rows traversed at once; bounds the (rows x trees) node-index scratch arrays
+FOREST_BLOCK_ROWS = 4096
+PREPROCESSOR_STORE_DIR = "preprocessors"
+PREPROCESSOR_INDEX = "index.json"
+MANIFEST_NAME = "manifest.json"
+# Files a manifest covers (.mmap copies are derived from these and checked by mtime)
+MANIFEST_EXTENSIONS = (".joblib", ".keras", ".npz")
+
+
+def mmap_path(path):
+    return path + MMAP_SUFFIX
+
+
+def load_mapped(path):
+    """The memory-mapped copy of an artifact, or None if there is no usable one."""
+    mapped = mmap_path(path)
+    if not ARTIFACT_MMAP or not os.path.exists(mapped):
+        return None
+    if os.path.getmtime(mapped) < os.path.getmtime(path):
+        print(f"[Artifacts] Ignoring stale {mapped}; run 'python -m src.artifacts convert'")
+        return None
+    obj = joblib.load(mapped, mmap_mode="r")
+    if isinstance(obj, dict) and obj.get("format") == FOREST_FORMAT:
+        return ForestArrays(obj)
+    return obj
+
+
+def load_artifact(path):
+    """joblib.load, preferring the memory-mapped copy written by `convert`."""
+    obj = load_mapped(path)
+    return obj if obj is not None else joblib.load(path)
+
+
+def _preprocessor_index_path(model_root):
+    return os.path.join(model_root, PREPROCESSOR_STORE_DIR, PREPROCESSOR_INDEX)
+
+
+def read_preprocessor_index(model_root=MODELS_DIR):
+    """{preprocessor path relative to model_root: fingerprint}, empty if there is no store."""
+    try:
+        with open(_preprocessor_index_path(model_root)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_preprocessor_index(index, model_root):
+    path = _preprocessor_index_path(model_root)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+
+
+def _index_key(path, model_root):
+    return os.path.relpath(os.path.abspath(path), os.path.abspath(model_root)).replace(os.sep, "/")
+
+
+def stored_preprocessor_path(fingerprint, model_root=MODELS_DIR):
+    return os.path.join(model_root, PREPROCESSOR_STORE_DIR, f"{fingerprint}.joblib")
+
+
+def resolve_preprocessor_path(path, model_root=MODELS_DIR):
+    """
+    The file holding a model's preprocessor: the per-model file if there is one, otherwise
+    its shared copy in the preprocessor store. Unknown paths are returned unchanged.
+    """
+    if os.path.exists(path):
+        return path
+    fingerprint = read_preprocessor_index(model_root).get(_index_key(path, model_root))
+    return stored_preprocessor_path(fingerprint, model_root) if fingerprint else path
+
+
+def save_preprocessor(preprocessor, path, model_root=MODELS_DIR):
+    """
+    Save a fitted preprocessor for the model that expects it at `path`: written to the
+    store once per fingerprint and recorded in the index. Returns the fingerprint.
+    """
+    from .preprocessing import preprocessor_fingerprint
+
+    fingerprint = preprocessor_fingerprint(preprocessor)
+    stored = stored_preprocessor_path(fingerprint, model_root)
+    if not os.path.exists(stored):
+        os.makedirs(os.path.dirname(stored), exist_ok=True)
+        _dump_atomic(preprocessor, stored)
+    index = read_preprocessor_index(model_root)
+    index[_index_key(path, model_root)] = fingerprint
+    _write_preprocessor_index(index, model_root)
+    if os.path.exists(path):
+        os.remove(path)  # a per-model file would shadow the stored copy
+    return fingerprint
+
+
+def dedupe_preprocessors(model_root=MODELS_DIR, prune=False):
+    """
+    Fingerprint every per-model preprocessor file and copy each distinct one into the store,
+    byte for byte. With prune=True the per-model files are deleted afterwards. Returns {fingerprint: [paths]}.
+    """
+    from .preprocessing import preprocessor_fingerprint
+
+    store_dir = os.path.join(model_root, PREPROCESSOR_STORE_DIR)
+    paths = sorted(
+        path for path in glob.glob(os.path.join(model_root, "**", "preprocessor*.joblib"), recursive=True)
+        if os.path.dirname(os.path.abspath(path)) != os.path.abspath(store_dir)
+    )
+    index = read_preprocessor_index(model_root)
+    groups = {}
+    for path in paths:
+        fingerprint = preprocessor_fingerprint(joblib.load(path))
+        stored = stored_preprocessor_path(fingerprint, model_root)
+        if not os.path.exists(stored):
+            os.makedirs(store_dir, exist_ok=True)
+            # The original bytes, not a re-pickle: that would silently upgrade the file
+            # to whatever scikit-learn version happens to run the dedupe
+            tmp_path = stored + ".tmp"
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, stored)
+        index[_index_key(path, model_root)] = fingerprint
+        groups.setdefault(fingerprint, []).append(path)
+    if paths:
+        _write_preprocessor_index(index, model_root)
+    if prune:
+        for path in paths:
+            os.remove(path)
+    return groups
+
+
+def file_sha256(path, chunk_size=2**20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(model_dir):
+    """The manifest.json of a model directory, or None if it has none."""
+    try:
+        with open(os.path.join(model_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def build_manifest(model_dir, model_root=MODELS_DIR):
+    """
+    Checksums of the artifacts in model_dir ("files") and of the stored preprocessors its
+    models use ("preprocessors", by the per-model name the training script saved them under).
+    """
+    files = {}
+    for fname in sorted(os.listdir(model_dir)):
+        path = os.path.join(model_dir, fname)
+        if fname.endswith(MANIFEST_EXTENSIONS) and os.path.isfile(path):
+            files[fname] = {"sha256": file_sha256(path), "size": os.path.getsize(path)}
+    preprocessors = {}
+    prefix = _index_key(model_dir, model_root)
+    prefix = "" if prefix == "." else prefix
+    for key, fingerprint in sorted(read_preprocessor_index(model_root).items()):
+        directory, _, fname = key.rpartition("/")
+        stored = stored_preprocessor_path(fingerprint, model_root)
+        if directory == prefix and fname not in files and os.path.exists(stored):
+            preprocessors[fname] = {"fingerprint": fingerprint, "sha256": file_sha256(stored)}
+    return {"files": files, "preprocessors": preprocessors}
+
+
+def write_manifest(model_dir, model_root=MODELS_DIR):
+    """
+    (Re)write model_dir/manifest.json. The version is bumped only when a checksum changed,
+    so rewriting the manifest of an untouched directory is a no-op. Returns the manifest.
+    """
+    manifest = build_manifest(model_dir, model_root)
+    previous = read_manifest(model_dir)
+    if previous and all(previous.get(k) == manifest[k] for k in ("files", "preprocessors")):
+        return previous
+    manifest = {
+        "version": (previous or {}).get("version", 0) + 1,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **manifest,
+    }
+    path = os.path.join(model_dir, MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, path)
+    return manifest
+
+
+def write_all_manifests(model_root=MODELS_DIR):
+    """write_manifest for every directory under model_root holding artifacts (not the preprocessor store)."""
+    store_dir = os.path.abspath(os.path.join(model_root, PREPROCESSOR_STORE_DIR))
+    manifests = {}
+    for root, _, files in sorted(os.walk(model_root)):
+        if os.path.abspath(root) != store_dir and any(f.endswith(MANIFEST_EXTENSIONS) for f in files):
+            manifests[root] = write_manifest(root, model_root)
+    return manifests
+
+
+def manifest_checksums(model_dir, names, manifest=None):
+    """
+    {name: sha256} for the given artifact file names from the directory's manifest, or None
+    if there is no manifest or it does not cover all of them.
+    """
+    manifest = manifest if manifest is not None else read_manifest(model_dir)
+    if not manifest:
+        return None
+    checksums = {}
+    for name in names:
+        item = manifest["files"].get(name) or manifest["preprocessors"].get(name)
+        if item is None:
+            return None
+        checksums[name] = item["sha256"]
+    return checksums
+
+
+def verify_manifest(model_dir, names, model_root=MODELS_DIR):
+    """
+    Names whose file on disk does not match the manifest (a copy still in progress, or files
+    replaced without rewriting the manifest). Empty when everything matches or there is no manifest.
+    """
+    manifest = read_manifest(model_dir)
+    if not manifest:
+        return []
+    mismatched = []
+    for name in names:
+        item = manifest["files"].get(name) or manifest["preprocessors"].get(name)
+        path = os.path.join(model_dir, name)
+        if name in manifest["preprocessors"] and not os.path.exists(path):
+            path = stored_preprocessor_path(item["fingerprint"], model_root)
+        if item is None or not os.path.exists(path) or file_sha256(path) != item["sha256"]:
+            mismatched.append(name)
+    return mismatched
+
+
+class ForestArrays:
+    """
+    sklearn RandomForest{Regressor,Classifier} predictions from flat (memory-mappable) arrays.
+    Leaf nodes point to themselves, so all trees are walked together for max_depth steps.
+    """
+
+    def __init__(self, arrays):
+        self.kind = str(arrays["kind"])
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]  # (n_nodes,) for regressors, (n_nodes, n_classes) probabilities
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.n_features_in_ = int(arrays["n_features_in"])
+        self.n_estimators = len(self.roots)
+        if self.kind == "classifier":
+            self.classes_ = np.asarray(arrays["classes"])
+
+    def apply(self, X):
+        """Global leaf node index of every row in every tree, shape (n_rows, n_estimators)."""
+        # sklearn trees compare float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(len(X))[:, None]
+        nodes = np.broadcast_to(self.roots, (len(X), self.n_estimators))
+        for _ in range(self.max_depth):
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+        return nodes
+
+    def _mean_leaf_value(self, X):
+        X = np.asarray(X)
+        out = np.zeros((len(X),) + self.value.shape[1:], dtype=np.float64)
+        for start in range(0, len(X), FOREST_BLOCK_ROWS):
+            leaves = self.apply(X[start:start + FOREST_BLOCK_ROWS])
+            block = out[start:start + FOREST_BLOCK_ROWS]
+            # Tree by tree, in order, so the sum rounds exactly like sklearn's
+            for t in range(self.n_estimators):
+                block += self.value[leaves[:, t]]
+        out /= self.n_estimators
+        return out
+
+    def contributions(self, X, output=None):
+        """
+        Path attribution: every split a row passes through credits its feature with the
+        change in node value from parent to child, averaged over the trees. Returns
+        (bias, contributions) with contributions of shape (n_rows, n_features_in_);
+        bias + contributions.sum(axis=1) is the prediction. `output` picks the class
+        column of a classifier.
+        """
+        value = self.value if output is None else self.value[:, output]
+        X = np.asarray(X)
+        n_features = self.n_features_in_
+        out = np.zeros((len(X), n_features), dtype=np.float64)
+        for start in range(0, len(X), FOREST_BLOCK_ROWS):
+            block = np.asarray(X[start:start + FOREST_BLOCK_ROWS], dtype=np.float32)
+            rows = np.arange(len(block))[:, None]
+            nodes = np.broadcast_to(self.roots, (len(block), self.n_estimators))
+            flat = np.zeros(len(block) * n_features, dtype=np.float64)
+            for _ in range(self.max_depth):
+                feature = self.feature[nodes]
+                go_left = block[rows, feature] <= self.threshold[nodes]
+                children = np.where(go_left, self.left[nodes], self.right[nodes])
+                # Leaves point to themselves, so finished paths add 0
+                flat += np.bincount((rows * n_features + feature).ravel(),
+                                    weights=(value[children] - value[nodes]).ravel(),
+                                    minlength=flat.size)
+                nodes = children
+            out[start:start + FOREST_BLOCK_ROWS] = flat.reshape(len(block), n_features)
+        out /= self.n_estimators
+        return float(value[self.roots].mean()), out
+
+    def predict(self, X):
+        if self.kind == "classifier":
+            return self.classes_.take(np.argmax(self.predict_proba(X), axis=1))
+        return self._mean_leaf_value(X)
+
+    def predict_proba(self, X):
+        if self.kind != "classifier":
+            raise AttributeError("predict_proba is only available for classifiers")
+        return self._mean_leaf_value(X)
+
+
+def forest_to_arrays(model):
+    """Flatten a fitted single-output sklearn random forest into ForestArrays' layout."""
+    from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+
+    if isinstance(model, RandomForestClassifier):
+        kind = "classifier"
+    elif isinstance(model, RandomForestRegressor):
+        kind = "regressor"
+    else:
+        raise ValueError(f"{type(model).__name__} is not a random forest")
+    if getattr(model, "n_outputs_", 1) != 1:
+        raise ValueError("Multi-output forests are not supported")
+
+    lefts, rights, features, thresholds, values, roots = [], [], [], [], [], []
+    offset, max_depth = 0, 0
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        n = tree.node_count
+        leaf = tree.children_left == -1
+        own = np.arange(offset, offset + n, dtype=np.int64)
+        lefts.append(np.where(leaf, own, tree.children_left + offset))
+        rights.append(np.where(leaf, own, tree.children_right + offset))
+        features.append(np.where(leaf, 0, tree.feature).astype(np.int64))
+        thresholds.append(np.where(leaf, 0.0, tree.threshold))
+        if kind == "classifier":
+            value = tree.value[:, 0, :]
+            # What DecisionTreeClassifier.predict_proba returns for each leaf
+            normalizer = value.sum(axis=1, keepdims=True)
+            normalizer[normalizer == 0.0] = 1.0
+            values.append(value / normalizer)
+        else:
+            values.append(tree.value[:, 0, 0])
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "format": FOREST_FORMAT,
+        "kind": kind,
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "value": np.ascontiguousarray(np.concatenate(values), dtype=np.float64),
+        "roots": np.asarray(roots, dtype=np.int64),
+        "max_depth": max_depth,
+        "n_features_in": model.n_features_in_,
+        "classes": np.asarray(model.classes_) if kind == "classifier" else None,
+    }
+    return arrays
+
+
+def verify_forest(model, forest, n_samples=512, seed=0):
+    """Raise AssertionError unless ForestArrays reproduces the sklearn forest exactly."""
+    X = np.random.default_rng(seed).normal(size=(n_samples, model.n_features_in_))
+    if forest.kind == "classifier":
+        expected, actual = model.predict_proba(X), forest.predict_proba(X)
+    else:
+        expected, actual = model.predict(X), forest.predict(X)
+    if not np.array_equal(expected, actual):
+        raise AssertionError(f"Forest arrays differ from sklearn by {np.max(np.abs(expected - actual))}")
+
+
+def _dump_atomic(obj, path):
+    tmp_path = path + ".tmp"
+    # compress=0 so joblib writes the arrays raw and page-aligned, which mmap_mode needs
+    joblib.dump(obj, tmp_path, compress=0)
+    os.replace(tmp_path, path)
+
+
+def convert_artifact(path):
+    """Write the .mmap copy of one artifact; returns a short description of what was written."""
+    if path.endswith(".npz"):
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        _dump_atomic(arrays, mmap_path(path))
+        return "weights"
+
+    obj = joblib.load(path)
+    if type(obj).__module__.startswith("xgboost"):
+        return None  # native memory; nothing to share
+    if type(obj).__name__ in ("RandomForestRegressor", "RandomForestClassifier"):
+        arrays = forest_to_arrays(obj)
+        verify_forest(obj, ForestArrays(arrays))
+        _dump_atomic(arrays, mmap_path(path))
+        return "forest arrays"
+    _dump_atomic(obj, mmap_path(path))
+    return "joblib"
+
+
+def convert_all(model_root=MODELS_DIR):
+    """Convert every .joblib and .npz artifact under model_root."""
+    paths = sorted(
+        glob.glob(os.path.join(model_root, "**", "*.joblib"), recursive=True)
+        + glob.glob(os.path.join(model_root, "**", "*.npz"), recursive=True)
+    )
+    for path in paths:
+        try:
+            kind = convert_artifact(path)
+        except (AssertionError, ValueError) as e:
+            print(f"[Artifacts] Skipped {path}: {e}")
+            continue
+        if kind is None:
+            print(f"[Artifacts] Skipped {path}: XGBoost models live in native memory")
+        else:
+            size = os.path.getsize(mmap_path(path))
+            print(f"[Artifacts] {path} -> {mmap_path(path)} ({kind}, {size / 2**20:.2f} MiB)")
+
+
+def memory_status():
+    """Anonymous (private heap) and file-backed resident memory of this process, in bytes."""
+    status = {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("RssAnon:", "RssFile:")):
+                    name, value = line.split(":")
+                    status[name] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    return status
+
+
+def _measure(model_id):
+    """Load one model in this (fresh) process, score one row and print the memory deltas as JSON."""
+    from .model_manager import MODEL_CACHE, import_backend, predict_batch
+
+    if "xgboost" in model_id:
+        import_backend("xgboost")  # the library itself is not part of the model's footprint
+    before = memory_status()
+    MODEL_CACHE.get(model_id)
+    predict_batch([{}], model_id, cache_lookup=False)
+    after = memory_status()
+    print(json.dumps({key: after.get(key, 0) - before.get(key, 0) for key in ("RssAnon", "RssFile")}))
+
+
+def memory_report(model_ids=None):
+    """
+    Per model: private memory each worker needs with plain joblib.load vs memory-mapped
+    artifacts, measured in fresh subprocesses. The difference is what every extra worker saves;
+    file-backed pages are shared by all workers through the page cache.
+    """
+    import subprocess
+    from .model_manager import build_model_registry
+
+    model_ids = model_ids or sorted(build_model_registry())
+    backend_dir = os.path.dirname(BASE_DIR)
+    report = {}
+    for model_id in model_ids:
+        row = {}
+        for label, flag in (("plain", "0"), ("mmap", "1")):
+            env = dict(os.environ, ARTIFACT_MMAP=flag, PYTHONWARNINGS="ignore")
+            proc = subprocess.run(
+                [sys.executable, "-m", "src.artifacts", "_measure", model_id],
+                cwd=backend_dir, env=env, capture_output=True, text=True,
+            )
+            lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+            if proc.returncode != 0 or not lines:
+                raise RuntimeError(f"Measuring {model_id} failed:\n{proc.stderr[-2000:]}")
+            row[label] = json.loads(lines[-1])
+        row["saved_per_worker_bytes"] = row["plain"]["RssAnon"] - row["mmap"]["RssAnon"]
+        report[model_id] = row
+    return report
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "convert":
+        convert_all(sys.argv[2] if len(sys.argv) > 2 else MODELS_DIR)
+    elif command == "report":
+        if not memory_status():
+            print("[Artifacts] Memory report needs /proc (Linux)")
+            sys.exit(1)
+        mib = 2 ** 20
+        for model_id, row in memory_report(sys.argv[2:] or None).items():
+            print(f"[Artifacts] {model_id}: private {row['plain']['RssAnon'] / mib:.1f} MiB plain, "
+                  f"{row['mmap']['RssAnon'] / mib:.1f} MiB mmap ({row['mmap']['RssFile'] / mib:.1f} MiB shared); "
+                  f"saves {row['saved_per_worker_bytes'] / mib:.1f} MiB per extra worker")
+    elif command == "dedupe":
+        args = sys.argv[2:]
+        prune = "--prune" in args
+        args = [a for a in args if a != "--prune"]
+        groups = dedupe_preprocessors(args[0] if args else MODELS_DIR, prune=prune)
+        for fingerprint, paths in groups.items():
+            print(f"[Artifacts] {fingerprint}: {len(paths)} preprocessor(s) {[os.path.basename(p) for p in paths]}")
+        total = sum(len(paths) for paths in groups.values())
+        print(f"[Artifacts] {total} preprocessor file(s), {len(groups)} distinct"
+              + ("; per-model copies removed" if prune else ""))
+    elif command == "manifest":
+        for model_dir, manifest in write_all_manifests(sys.argv[2] if len(sys.argv) > 2 else MODELS_DIR).items():
+            print(f"[Artifacts] {model_dir}: version {manifest['version']}, "
+                  f"{len(manifest['files'])} file(s), {len(manifest['preprocessors'])} stored preprocessor(s)")
+    elif command == "_measure":
+        _measure(sys.argv[2])
+    else:
+        print("Usage: python -m src.artifacts convert [models_dir] | report [model_id ...] | dedupe [--prune] [models_dir] | manifest [models_dir]")
+        sys.exit(1)
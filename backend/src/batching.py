@@ -0,0 +1,131 @@
+# backend/src/batching.py
+"""
+Per-model dynamic micro-batching for /predict.
+Concurrent single-row requests for the same model_id are collected for up to
+BATCH_MAX_WAIT_MS milliseconds (or BATCH_MAX_ROWS rows), scored with one predict_batch
+call on the inference pool, and each caller gets back its own row's result.
+"""
+import os
+import time
+import asyncio
+import functools
+
+from . import metrics
+from .executor import run_inference
+from .metrics import Histogram
+
+MICRO_BATCHING = os.getenv("MICRO_BATCHING", "1") != "0"
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", 2))
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", 64))
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+class MicroBatcher:
+    """Collects single-row predictions for one model and flushes them as a batch."""
+
+    def __init__(self, model_id, predict_fn, max_wait_ms=BATCH_MAX_WAIT_MS, max_rows=BATCH_MAX_ROWS):
+        self.model_id = model_id
+        self.predict_fn = predict_fn
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_rows = max_rows
+        self._pending = []  # (features, future, enqueued_at)
+        self._timer = None
+        self._tasks = set()  # keep strong references to in-flight flushes
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+
+    async def submit(self, features):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((features, future, time.perf_counter()))
+        if len(self._pending) >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        result, timings, queue_wait = await future
+        metrics.add_timing("batch_wait", queue_wait)
+        metrics.add_timings(timings)
+        return result
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        now = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            self.queue_wait_ms.observe((now - enqueued_at) * 1000.0)
+        await self._score(batch, now)
+
+    async def _score(self, batch, now):
+        try:
+            # The batch's stage timings are shared by every request in it (see submit)
+            results, timings = await run_inference(
+                metrics.collect_timings, self.predict_fn, [features for features, _, _ in batch], self.model_id,
+            )
+        except (ValueError, TypeError) as e:
+            if len(batch) == 1:
+                self._fail(batch, e)
+            else:
+                # One bad row must not fail the requests batched with it: score each on its own
+                await asyncio.gather(*(self._score([item], now) for item in batch))
+            return
+        except Exception as e:
+            # A full queue, a failed model load or MemoryError hits every row alike; retrying
+            # them one by one would only add load where the server should be shedding it
+            self._fail(batch, e)
+            return
+        for (_, future, enqueued_at), result in zip(batch, results):
+            if not future.done():
+                future.set_result((result, timings, now - enqueued_at))
+
+    @staticmethod
+    def _fail(batch, error):
+        for _, future, _ in batch:
+            if not future.done():
+                future.set_exception(error)
+
+    def stats(self):
+        return {
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+        }
+
+
+BATCHERS = {}
+
+
+def get_batcher(model_id):
+    batcher = BATCHERS.get(model_id)
+    if batcher is None:
+        from .model_manager import predict_batch
+        # predict_one already checked the result cache, so the batch only stores results
+        batcher = BATCHERS[model_id] = MicroBatcher(model_id, functools.partial(predict_batch, cache_lookup=False))
+    return batcher
+
+
+async def predict_one(features, model_id):
+    """Score one feature dict, coalescing with concurrent requests for the same model."""
+    from .model_manager import get_cached_prediction
+    # Cache hits are answered on the event loop without queueing for a batch
+    cached = get_cached_prediction(features, model_id)
+    if cached is not None:
+        return cached
+    if not MICRO_BATCHING:
+        from .model_manager import predict_batch
+        results = await run_inference(predict_batch, [features], model_id, cache_lookup=False)
+        return results[0]
+    return await get_batcher(model_id).submit(features)
+
+
+def batching_stats():
+    return {model_id: batcher.stats() for model_id, batcher in BATCHERS.items()}
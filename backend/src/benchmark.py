@@ -0,0 +1,314 @@
+# backend/src/benchmark.py
+"""
+Inference benchmarks for every registered model, run against the artifacts in backend/models.
+For each model it records:
+  - cold load time (artifacts from disk to a ready cache entry; backend imports are reported
+    separately under meta.backend_import_seconds),
+  - single-row p50 / p99 / mean latency of each stage of the prediction path,
+  - rows/second of each stage at several batch sizes.
+
+Stages: prepare_dataframe (records -> DataFrame), sklearn_transform (ColumnTransformer),
+fast_transform (compiled NumPy preprocessor, what the API uses), dmatrix (xgb.DMatrix, XGBoost
+regression only), model_call (the bare predict / predict_proba), score (model call plus output
+formatting, as in _score_matrix) and end_to_end (predict_batch without the result-cache lookup).
+
+Results are written as JSON so runs can be compared across commits; `compare` (or `run
+--baseline`) fails when a p50 latency, throughput or cold load time regressed by more than
+the threshold. p99 is reported but not checked, as it is too noisy on shared machines.
+
+Usage (run from the backend directory):
+    python -m src.benchmark run --out bench.json
+    python -m src.benchmark run --models xgboost_regression,linear_regression --baseline main.json
+    python -m src.benchmark compare main.json bench.json --threshold 0.15
+"""
+import os
+import sys
+import json
+import time
+import platform
+import subprocess
+
+import numpy as np
+
+DEFAULT_BATCH_SIZES = (1, 32, 256, 2048)
+DEFAULT_ITERATIONS = 200
+# Each throughput measurement runs for at least this long (and at least MIN_REPEATS calls)
+MIN_SECONDS = 0.25
+MIN_REPEATS = 3
+WARMUP_CALLS = 3
+DEFAULT_THRESHOLD = 0.10
+
+
+def synthetic_rows(n, seed=0):
+    """Feature dicts with realistic ranges for every input column any model reads."""
+    rng = np.random.default_rng(seed)
+    columns = {
+        "acousticness": rng.uniform(0, 1, n),
+        "danceability": rng.uniform(0, 1, n),
+        "duration_min": rng.uniform(1.5, 7, n),
+        "energy": rng.uniform(0, 1, n),
+        "instrumentalness": rng.uniform(0, 1, n),
+        "liveness": rng.uniform(0, 1, n),
+        "loudness": rng.uniform(-30, 0, n),
+        "speechiness": rng.uniform(0, 0.5, n),
+        "tempo": rng.uniform(60, 200, n),
+        "valence": rng.uniform(0, 1, n),
+        "explicit": rng.integers(0, 2, n),
+        "mode": rng.integers(0, 2, n),
+        "key": rng.integers(0, 12, n),
+        "year": rng.integers(1960, 2024, n),
+    }
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[c].tolist() for c in names))]
+
+
+def time_calls(fn, iterations, warmup=WARMUP_CALLS):
+    """Seconds taken by each of `iterations` calls of fn, after a few warm-up calls."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def latency_summary(samples):
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def rows_per_second(fn, batch_size, min_seconds=MIN_SECONDS):
+    """Throughput of fn over a batch of batch_size rows, calling it for at least min_seconds."""
+    fn()
+    calls, elapsed = 0, 0.0
+    while calls < MIN_REPEATS or elapsed < min_seconds:
+        start = time.perf_counter()
+        fn()
+        elapsed += time.perf_counter() - start
+        calls += 1
+    return batch_size * calls / elapsed
+
+
+def build_stages(model_id, artifacts, rows):
+    """{stage name: zero-argument callable} over the given rows, in pipeline order."""
+    from .model_manager import _score_matrix, import_backend, predict_batch
+    from .preprocessing import prepare_dataframe_from_records
+
+    model = artifacts["model"]
+    preproc = artifacts["preprocessor"]
+    fast_preproc = artifacts.get("fast_preprocessor")
+    df = prepare_dataframe_from_records(rows, preprocessor=preproc)
+    X = fast_preproc.transform_records(rows) if fast_preproc is not None else preproc.transform(df)
+
+    stages = {
+        "prepare_dataframe": lambda: prepare_dataframe_from_records(rows, preprocessor=preproc),
+        "sklearn_transform": lambda: preproc.transform(df),
+    }
+    if fast_preproc is not None:
+        stages["fast_transform"] = lambda: fast_preproc.transform_records(rows)
+    if "xgboost" in model_id and "regression" in model_id:
+        xgb = import_backend("xgboost")
+        dmatrix = xgb.DMatrix(X)
+        stages["dmatrix"] = lambda: xgb.DMatrix(X)
+        stages["model_call"] = lambda: model.predict(dmatrix)
+    elif "classification" in model_id and hasattr(model, "predict_proba"):
+        stages["model_call"] = lambda: model.predict_proba(X)
+    else:
+        stages["model_call"] = lambda: model.predict(X)
+    stages["score"] = lambda: _score_matrix(X, model_id, artifacts)
+    stages["end_to_end"] = lambda: predict_batch(rows, model_id, cache_lookup=False)
+    return stages
+
+
+def benchmark_model(model_id, batch_sizes=DEFAULT_BATCH_SIZES, iterations=DEFAULT_ITERATIONS, seed=0):
+    """Cold load, single-row latency and batch throughput of every stage for one model."""
+    from .model_manager import (
+        MODEL_CACHE, PREPROCESSORS, get_model_entry, import_backend, load_model_into_cache_entry,
+    )
+
+    entry = get_model_entry(model_id)
+    if entry is None:
+        raise ValueError(f"Model '{model_id}' is not registered.")
+    if "xgboost" in model_id:
+        import_backend("xgboost")  # timed once, under meta.backend_import_seconds
+    # Nothing shared with models loaded earlier in this run, so every model loads cold
+    PREPROCESSORS.clear()
+    MODEL_CACHE.evict(model_id)
+    start = time.perf_counter()
+    artifacts = load_model_into_cache_entry(model_id)
+    cold_load = time.perf_counter() - start
+    MODEL_CACHE.put(model_id, artifacts, load_seconds=cold_load)  # end_to_end goes through the cache
+
+    rows = synthetic_rows(max(batch_sizes), seed=seed)
+    single = build_stages(model_id, artifacts, rows[:1])
+    result = {
+        "task": entry["task"],
+        "cold_load_seconds": cold_load,
+        "single_row": {name: latency_summary(time_calls(fn, iterations)) for name, fn in single.items()},
+        "throughput": {name: {} for name in single},
+    }
+    for batch_size in batch_sizes:
+        for name, fn in build_stages(model_id, artifacts, rows[:batch_size]).items():
+            result["throughput"][name][str(batch_size)] = rows_per_second(fn, batch_size)
+    return result
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def library_versions():
+    versions = {"python": platform.python_version(), "numpy": np.__version__}
+    for name in ("pandas", "sklearn", "xgboost"):
+        module = sys.modules.get(name)
+        if module is not None:
+            versions[name] = getattr(module, "__version__", None)
+    return versions
+
+
+def run_benchmarks(model_ids=None, batch_sizes=DEFAULT_BATCH_SIZES, iterations=DEFAULT_ITERATIONS, seed=0):
+    """Benchmark the given (default: all registered) models; returns the JSON-ready report."""
+    import warnings
+    from . import model_manager
+    from .model_manager import BACKEND_IMPORT_SECONDS, build_model_registry
+    from .result_cache import ResultCache
+
+    warnings.filterwarnings("ignore")
+    # Imported up front so the first model's cold load doesn't also pay for pandas / sklearn
+    import pandas  # noqa: F401
+    import sklearn.compose  # noqa: F401
+    registry = build_model_registry()
+    model_ids = model_ids or list(registry)
+    models = {}
+    # end_to_end stores its synthetic rows in a private, memory-only cache rather than the
+    # shared one (and its SQLite tier, when RESULT_CACHE_DIR is set)
+    shared_cache = model_manager.RESULT_CACHE
+    model_manager.RESULT_CACHE = ResultCache(
+        "BenchCache", max_entries=shared_cache.max_entries, ttl_seconds=shared_cache.ttl_seconds,
+    )
+    try:
+        for model_id in model_ids:
+            print(f"[Bench] {model_id}...")
+            models[model_id] = benchmark_model(model_id, batch_sizes, iterations, seed)
+    finally:
+        model_manager.RESULT_CACHE = shared_cache
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "versions": library_versions(),
+            "backend_import_seconds": dict(BACKEND_IMPORT_SECONDS),
+            "batch_sizes": list(batch_sizes),
+            "iterations": iterations,
+            "seed": seed,
+        },
+        "models": models,
+    }
+
+
+def comparable_metrics(report):
+    """{metric path: (value, higher_is_better)} for the metrics checked by compare_reports."""
+    metrics = {}
+    for model_id, result in report.get("models", {}).items():
+        metrics[f"{model_id}.cold_load_seconds"] = (result["cold_load_seconds"], False)
+        for stage, summary in result["single_row"].items():
+            metrics[f"{model_id}.single_row.{stage}.p50_ms"] = (summary["p50_ms"], False)
+        for stage, by_size in result["throughput"].items():
+            for batch_size, value in by_size.items():
+                metrics[f"{model_id}.throughput.{stage}.{batch_size}"] = (value, True)
+    return metrics
+
+
+def compare_reports(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    Metrics present in both reports that got worse by more than threshold (a fraction).
+    Returns a list of {"metric", "baseline", "current", "change"} dicts, worst first.
+    """
+    base, cur = comparable_metrics(baseline), comparable_metrics(current)
+    regressions = []
+    for metric, (value, higher_is_better) in cur.items():
+        if metric not in base or not base[metric][0]:
+            continue
+        change = value / base[metric][0] - 1.0
+        worse = change < -threshold if higher_is_better else change > threshold
+        if worse:
+            regressions.append({"metric": metric, "baseline": base[metric][0], "current": value, "change": change})
+    return sorted(regressions, key=lambda r: -abs(r["change"]))
+
+
+def print_summary(report):
+    for model_id, result in report["models"].items():
+        print(f"[Bench] {model_id}: cold load {result['cold_load_seconds'] * 1000:.1f} ms")
+        for stage, summary in result["single_row"].items():
+            throughput = ", ".join(f"{size}: {value:,.0f}" for size, value in result["throughput"][stage].items())
+            print(f"[Bench]   {stage:<18} p50 {summary['p50_ms']:8.3f} ms  p99 {summary['p99_ms']:8.3f} ms  "
+                  f"rows/s [{throughput}]")
+
+
+def print_regressions(regressions, threshold):
+    for r in regressions:
+        print(f"[Bench] REGRESSION {r['metric']}: {r['baseline']:.4g} -> {r['current']:.4g} ({r['change']:+.1%})")
+    print(f"[Bench] {len(regressions)} regression(s) beyond {threshold:.0%}")
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark inference latency and throughput of the registered models.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="Run the benchmarks and write a JSON report")
+    run.add_argument("--models", default="", help="Comma-separated model ids (default: all registered)")
+    run.add_argument("--batch-sizes", default=",".join(map(str, DEFAULT_BATCH_SIZES)), help="Comma-separated batch sizes")
+    run.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="Single-row calls per stage")
+    run.add_argument("--seed", type=int, default=0, help="Seed for the synthetic rows")
+    run.add_argument("--out", default="benchmark.json", help="Report path")
+    run.add_argument("--baseline", help="Report to compare against; exit 1 on regressions")
+    run.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown as a fraction")
+    compare = sub.add_parser("compare", help="Compare two JSON reports")
+    compare.add_argument("baseline")
+    compare.add_argument("current")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown as a fraction")
+    args = parser.parse_args(argv)
+
+    if args.command == "run":
+        model_ids = [m.strip() for m in args.models.split(",") if m.strip()]
+        batch_sizes = [int(b) for b in args.batch_sizes.split(",") if b.strip()]
+        try:
+            report = run_benchmarks(model_ids or None, batch_sizes, args.iterations, args.seed)
+        except ValueError as e:
+            print(f"[Bench] {e}")
+            return 1
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print_summary(report)
+        print(f"[Bench] Wrote {args.out}")
+        if not args.baseline:
+            return 0
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        current = report
+    else:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        with open(args.current) as f:
+            current = json.load(f)
+    regressions = compare_reports(baseline, current, args.threshold)
+    print_regressions(regressions, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# backend/src/executor.py
+"""
+Execution layer that keeps CPU-bound work off the asyncio event loop.
+Model inference runs on a bounded thread pool (sklearn, XGBoost and TensorFlow release
+the GIL for the heavy parts); OCR runs on a separate process pool so a slow EasyOCR read
+cannot starve inference or /health. Each pool has a queue-depth limit and rejects new
+work with 503 once it is saturated.
+"""
+import os
+import asyncio
+import functools
+import contextvars
+import multiprocessing
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException
+
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 4))
+INFERENCE_QUEUE_LIMIT = int(os.getenv("INFERENCE_QUEUE_LIMIT", 64))
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", 1))
+OCR_QUEUE_LIMIT = int(os.getenv("OCR_QUEUE_LIMIT", 8))
+# 'spawn' keeps OCR workers from inheriting TensorFlow/XGBoost state from the server process
+OCR_START_METHOD = os.getenv("OCR_START_METHOD", "spawn")
+# Start every OCR worker (and load its EasyOCR reader) at startup rather than on the first upload
+OCR_PREWARM = os.getenv("OCR_PREWARM", "0") == "1"
+
+
+class BoundedExecutor:
+    """Wraps a concurrent.futures executor with a cap on queued + running jobs."""
+
+    def __init__(self, name, factory, max_pending, copy_context=False):
+        self.name = name
+        self.max_pending = max_pending
+        # Thread pools only: run jobs in a copy of the caller's context (request timings, see metrics)
+        self.copy_context = copy_context
+        self._factory = factory
+        self._executor = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._rejected = 0
+        self._completed = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the pool; raises 503 if the pool is saturated."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._rejected += 1
+                raise HTTPException(
+                    status_code=503,
+                    detail=f"{self.name} queue is full, please retry shortly.",
+                )
+            self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            call = functools.partial(fn, *args, **kwargs)
+            if self.copy_context:
+                call = functools.partial(contextvars.copy_context().run, call)
+            return await loop.run_in_executor(self._get_executor(), call)
+        except BrokenProcessPool:
+            # A crashed worker poisons the whole process pool; start a fresh one next time
+            self.reset()
+            raise HTTPException(status_code=503, detail=f"{self.name} worker crashed, please retry.")
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._completed += 1
+
+    def submit(self, fn, *args, **kwargs):
+        """Submit without the queue-depth check (for startup warm-up and background jobs)."""
+        return self._get_executor().submit(fn, *args, **kwargs)
+
+    def stats(self):
+        return {
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+        }
+
+    def reset(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+INFERENCE_EXECUTOR = BoundedExecutor(
+    "inference",
+    lambda: ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference"),
+    INFERENCE_QUEUE_LIMIT,
+    copy_context=True,
+)
+
+
+def _make_ocr_pool():
+    from .ocr_extract import init_ocr_worker
+    # Each worker builds its EasyOCR reader once when it starts and keeps it for its lifetime
+    return ProcessPoolExecutor(
+        max_workers=OCR_WORKERS,
+        mp_context=multiprocessing.get_context(OCR_START_METHOD),
+        initializer=init_ocr_worker,
+    )
+
+
+OCR_EXECUTOR = BoundedExecutor("ocr", _make_ocr_pool, OCR_QUEUE_LIMIT)
+
+
+async def run_inference(fn, *args, **kwargs):
+    """Run a model call on the inference thread pool."""
+    return await INFERENCE_EXECUTOR.run(fn, *args, **kwargs)
+
+
+async def run_ocr(fn, *args, **kwargs):
+    """Run an OCR job on the OCR process pool; fn and its arguments must be picklable."""
+    return await OCR_EXECUTOR.run(fn, *args, **kwargs)
+
+
+def prewarm_ocr_pool():
+    """Start all OCR workers now so their readers are loaded before the first upload."""
+    from .ocr_extract import warm_ocr_worker
+    return [OCR_EXECUTOR.submit(warm_ocr_worker) for _ in range(OCR_WORKERS)]
+
+
+def executor_stats():
+    return {"inference": INFERENCE_EXECUTOR.stats(), "ocr": OCR_EXECUTOR.stats()}
+
+
+def shutdown_executors(wait=False):
+    INFERENCE_EXECUTOR.shutdown(wait=wait)
+    OCR_EXECUTOR.shutdown(wait=wait)
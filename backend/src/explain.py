@@ -0,0 +1,73 @@
+# backend/src/explain.py
+"""
+Per-feature explanations for the tree models: how much each input moved a prediction away
+from the model's base value.
+
+XGBoost models use the booster's native pred_contribs (exact TreeSHAP, in the model's
+margin: popularity for the regressor, log-odds for the classifier). Random forests use path
+attribution over ForestArrays (see ForestArrays.contributions), in popularity or hit
+probability. Both attribute to the preprocessor's output columns; fold_contributions adds
+the one-hot columns of a categorical input (key_0 ... key_11) back into that input.
+Caching and batching are handled by model_manager.explain_batch.
+"""
+import numpy as np
+
+from .artifacts import ForestArrays, forest_to_arrays
+
+
+def supports_explanations(model_type):
+    return "xgboost" in model_type or "randomforest" in model_type
+
+
+def explanation_output(model_type):
+    """The quantity a model's contributions add up to."""
+    if "classification" not in model_type:
+        return "predicted_popularity"
+    return "log_odds" if "xgboost" in model_type else "probability"
+
+
+def forest_for(model):
+    """ForestArrays view of a random forest; flattening a sklearn forest is slow, so keep the result."""
+    return model if isinstance(model, ForestArrays) else ForestArrays(forest_to_arrays(model))
+
+
+def tree_contributions(model, X, model_type, xgb=None, forest=None):
+    """
+    (base values (n_rows,), contributions (n_rows, n_columns)) of a tree model on a
+    transformed matrix. `xgb` is the xgboost module; `forest` an already flattened forest.
+    """
+    if "xgboost" in model_type:
+        booster = model.get_booster() if hasattr(model, "get_booster") else model
+        contribs = np.asarray(booster.predict(xgb.DMatrix(X), pred_contribs=True), dtype=np.float64)
+        return contribs[:, -1], contribs[:, :-1]
+    if "randomforest" in model_type:
+        forest = forest if forest is not None else forest_for(model)
+        # Classifiers are explained for the "hit" class, whose probability predictions report
+        bias, contribs = forest.contributions(X, output=1 if forest.kind == "classifier" else None)
+        return np.full(len(contribs), bias), contribs
+    raise ValueError(f"Explanations are only available for tree models, not {model_type}.")
+
+
+def fold_contributions(contribs, sources):
+    """
+    Sum the columns of contribs that come from the same input (see
+    preprocessing.preprocessor_output_sources). Returns (input names, (n_rows, n_inputs)).
+    """
+    names = list(dict.fromkeys(sources))
+    position = {name: i for i, name in enumerate(names)}
+    fold = np.zeros((len(sources), len(names)))
+    fold[np.arange(len(sources)), [position[s] for s in sources]] = 1.0
+    return names, contribs @ fold
+
+
+def explanation_rows(base_values, contribs, names, output):
+    """One explanation dict per row, contributions ordered by absolute size."""
+    rows = []
+    for base, values in zip(base_values.tolist(), contribs.tolist()):
+        order = sorted(range(len(names)), key=lambda i: -abs(values[i]))
+        rows.append({
+            "output": output,
+            "base_value": base,
+            "contributions": {names[i]: values[i] for i in order},
+        })
+    return rows
@@ -0,0 +1,290 @@
+# backend/src/metrics.py
+"""
+Hot-path instrumentation.
+Stages of a request (normalize, preprocess, infer, ocr_decode, ocr_recognize, ocr_parse, ...)
+are timed with `timed(stage, model_id)` or `record(...)`. Every timing is observed in a
+latency histogram per (stage, model_id), served by /metrics in the Prometheus text format,
+and added to the current request's timings, which the API middleware sends back as a
+Server-Timing header. A request's timings travel in a ContextVar; the inference pool runs
+jobs in a copy of the caller's context (see executor.BoundedExecutor), and work done in
+other processes (OCR) returns its timings with its result (see collect_timings).
+
+Per-request log lines go through get_logger(): LOG_LEVEL sets the threshold and
+LOG_SAMPLE_RATE the fraction of per-request debug lines that are actually written.
+"""
+import os
+import sys
+import time
+import bisect
+import random
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# Seconds; spans cached lookups (~10 us) to full-frame OCR (~10 s)
+LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10,
+)
+METRICS_PREFIX = "hitpredictor"
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.01))
+
+# {(stage, model_id): seconds} of the request being handled, None outside a request
+_REQUEST_TIMINGS = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    """Fixed-bucket histogram (cumulative 'le' buckets like Prometheus)."""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = {}, 0
+            for bound, n in zip(self.buckets + ("+Inf",), self.counts):
+                running += n
+                cumulative[str(bound)] = running
+            return {"buckets": cumulative, "count": self.count, "sum": self.sum}
+
+
+class LabeledHistograms:
+    """One Histogram per label tuple, created on first observation."""
+
+    def __init__(self, label_names, buckets=LATENCY_BUCKETS):
+        self.label_names = tuple(label_names)
+        self.buckets = buckets
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        histogram = self._histograms.get(labels)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(labels, Histogram(self.buckets))
+        histogram.observe(value)
+
+    def items(self):
+        with self._lock:
+            return sorted(self._histograms.items())
+
+
+class LabeledCounter:
+    """Monotonic counters keyed by label tuple."""
+
+    def __init__(self, label_names):
+        self.label_names = tuple(label_names)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def items(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+
+STAGE_SECONDS = LabeledHistograms(("stage", "model_id"))
+REQUEST_SECONDS = LabeledHistograms(("route", "method"))
+REQUESTS = LabeledCounter(("route", "method", "status"))
+# Prediction rows per model, by where the answer came from ("cache" or "model")
+PREDICTION_ROWS = LabeledCounter(("model_id", "source"))
+
+
+def observe(stage, seconds, model_id=""):
+    """Histogram only (for work that is already reported in Server-Timing elsewhere)."""
+    STAGE_SECONDS.observe((stage, model_id), seconds)
+
+
+def add_timing(stage, seconds, model_id=""):
+    """Server-Timing only: add to the current request's total for this stage."""
+    timings = _REQUEST_TIMINGS.get()
+    if timings is not None:
+        key = (stage, model_id)
+        timings[key] = timings.get(key, 0.0) + seconds
+
+
+def record(stage, seconds, model_id=""):
+    observe(stage, seconds, model_id)
+    add_timing(stage, seconds, model_id)
+
+
+@contextmanager
+def timed(stage, model_id=""):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start, model_id)
+
+
+def start_request():
+    """Begin collecting Server-Timing entries for the current request; returns the collector."""
+    timings = {}
+    _REQUEST_TIMINGS.set(timings)
+    return timings
+
+
+def collect_timings(fn, *args, **kwargs):
+    """
+    Call fn with a fresh timings collector and return (result, timings) so the caller can
+    add them to its own request: for work run in another process, or shared by several
+    requests (a micro-batch).
+    """
+    timings = {}
+    token = _REQUEST_TIMINGS.set(timings)
+    try:
+        return fn(*args, **kwargs), timings
+    finally:
+        _REQUEST_TIMINGS.reset(token)
+
+
+def add_timings(timings, observe_histograms=False):
+    """Merge timings returned by collect_timings into the current request."""
+    for (stage, model_id), seconds in timings.items():
+        if observe_histograms:
+            observe(stage, seconds, model_id)
+        add_timing(stage, seconds, model_id)
+
+
+def observe_request(route, method, status, seconds):
+    REQUESTS.inc((route, method, str(status)))
+    REQUEST_SECONDS.observe((route, method), seconds)
+
+
+def server_timing_header(timings, total_seconds):
+    """Server-Timing value: one entry per (stage, model_id) plus the request total, in ms."""
+    entries = []
+    for (stage, model_id), seconds in timings.items():
+        desc = f';desc="{model_id}"' if model_id else ""
+        entries.append(f"{stage}{desc};dur={seconds * 1000:.3f}")
+    entries.append(f"total;dur={total_seconds * 1000:.3f}")
+    return ", ".join(entries)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in list(zip(names, values)) + list(extra)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class PrometheusWriter:
+    """Builds the text exposition format, one metric family at a time."""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name, kind, help_text):
+        self.lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+        self.lines.append(f"# TYPE {METRICS_PREFIX}_{name} {kind}")
+
+    def sample(self, name, value, label_names=(), label_values=(), extra=()):
+        labels = _labels(label_names, label_values, extra)
+        self.lines.append(f"{METRICS_PREFIX}_{name}{labels} {_format_number(value)}")
+
+    def histogram(self, name, label_names, label_values, snapshot):
+        for bound, count in snapshot["buckets"].items():
+            self.sample(f"{name}_bucket", count, label_names, label_values, extra=[("le", bound)])
+        self.sample(f"{name}_sum", snapshot["sum"], label_names, label_values)
+        self.sample(f"{name}_count", snapshot["count"], label_names, label_values)
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+def render_metrics(caches=None, batchers=None, executors=None):
+    """
+    Prometheus text exposition of the stage / request histograms and counters, plus
+    scrape-time snapshots of caches ({name: stats() dict}), micro-batchers
+    ({model_id: MicroBatcher.stats()}) and executor queues ({name: stats() dict}).
+    """
+    out = PrometheusWriter()
+
+    out.family("stage_seconds", "histogram", "Time spent in each stage of the request path.")
+    for labels, histogram in STAGE_SECONDS.items():
+        out.histogram("stage_seconds", STAGE_SECONDS.label_names, labels, histogram.snapshot())
+
+    out.family("request_seconds", "histogram", "HTTP request latency by route.")
+    for labels, histogram in REQUEST_SECONDS.items():
+        out.histogram("request_seconds", REQUEST_SECONDS.label_names, labels, histogram.snapshot())
+
+    out.family("requests_total", "counter", "HTTP requests by route and status code.")
+    for labels, value in REQUESTS.items():
+        out.sample("requests_total", value, REQUESTS.label_names, labels)
+
+    out.family("prediction_rows_total", "counter", "Prediction rows by model and source (cache or model).")
+    for labels, value in PREDICTION_ROWS.items():
+        out.sample("prediction_rows_total", value, PREDICTION_ROWS.label_names, labels)
+
+    if caches:
+        out.family("cache_hits_total", "counter", "Cache hits.")
+        for name, stats in caches.items():
+            out.sample("cache_hits_total", stats.get("hits", 0), ("cache",), (name,))
+        out.family("cache_misses_total", "counter", "Cache misses.")
+        for name, stats in caches.items():
+            out.sample("cache_misses_total", stats.get("misses", 0), ("cache",), (name,))
+        out.family("cache_hit_ratio", "gauge", "Hits / (hits + misses) since startup.")
+        for name, stats in caches.items():
+            lookups = stats.get("hits", 0) + stats.get("misses", 0)
+            out.sample("cache_hit_ratio", stats.get("hits", 0) / lookups if lookups else 0.0, ("cache",), (name,))
+        out.family("cache_entries", "gauge", "Entries currently held in memory.")
+        for name, stats in caches.items():
+            size = stats["size"] if "size" in stats else len(stats.get("models", ()))
+            out.sample("cache_entries", size, ("cache",), (name,))
+
+    if batchers:
+        out.family("batch_size", "histogram", "Rows per micro-batch.")
+        for model_id, stats in sorted(batchers.items()):
+            out.histogram("batch_size", ("model_id",), (model_id,), stats["batch_size"])
+        out.family("batch_queue_wait_ms", "histogram", "Milliseconds a row waited for its micro-batch.")
+        for model_id, stats in sorted(batchers.items()):
+            out.histogram("batch_queue_wait_ms", ("model_id",), (model_id,), stats["queue_wait_ms"])
+
+    if executors:
+        out.family("executor_pending", "gauge", "Jobs queued or running on each worker pool.")
+        for name, stats in sorted(executors.items()):
+            out.sample("executor_pending", stats["pending"], ("pool",), (name,))
+        out.family("executor_rejected_total", "counter", "Jobs rejected because the pool queue was full.")
+        for name, stats in sorted(executors.items()):
+            out.sample("executor_rejected_total", stats["rejected"], ("pool",), (name,))
+    return out.text()
+
+
+def get_logger(name):
+    """A logger printing '[name] message' to stdout at LOG_LEVEL, like the rest of the server's output."""
+    logger = logging.getLogger(name)
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("[%(name)s] %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(getattr(logging, LOG_LEVEL, logging.INFO))
+        logger.propagate = False
+    return logger
+
+
+def sampled_debug(logger, msg, *args):
+    """logger.debug for one request in 1/LOG_SAMPLE_RATE; args are only formatted if it is written."""
+    if logger.isEnabledFor(logging.DEBUG) and (LOG_SAMPLE_RATE >= 1 or random.random() < LOG_SAMPLE_RATE):
+        logger.debug(msg, *args)
@@ -0,0 +1,178 @@
+# backend/src/model_cache.py
+"""
+Lazy, bounded model cache.
+Models are loaded on first use through a loader callback. Concurrent requests for a
+model that is still loading wait for the same load (single-flight) instead of each
+loading their own copy. A count and/or byte budget is enforced with LRU eviction;
+pinned models are never evicted. Memory per model is the process RSS growth observed
+while loading it, which is approximate but good enough to size the budget.
+"""
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def current_rss_bytes():
+    """Resident set size of this process in bytes (0 if it cannot be determined)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a high-water mark (KiB on Linux, bytes on macOS), only a fallback
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss if os.uname().sysname == "Darwin" else rss * 1024
+    except (ImportError, OSError, AttributeError):
+        return 0
+
+
+class ModelCache:
+    """Dict-like cache of loaded model artifacts keyed by model id."""
+
+    def __init__(self, loader, max_models=0, max_bytes=0, pinned=()):
+        self.loader = loader
+        self.max_models = max_models
+        self.max_bytes = max_bytes
+        self.pinned = set(pinned)
+        self._entries = OrderedDict()  # model_id -> artifacts, least recently used first
+        self._info = {}  # model_id -> {"bytes", "load_seconds", "loaded_at", "hits"}
+        self._loading = {}  # model_id -> Future shared by concurrent callers
+        self._lock = threading.Lock()
+        # Loads are serialized so the RSS delta can be attributed to a single model
+        self._load_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, model_id):
+        """Return the artifacts for model_id, loading them on first use."""
+        with self._lock:
+            artifacts = self._entries.get(model_id)
+            if artifacts is not None:
+                self._entries.move_to_end(model_id)
+                self._info[model_id]["hits"] += 1
+                self.hits += 1
+                return artifacts
+            self.misses += 1
+            future = self._loading.get(model_id)
+            owner = future is None
+            if owner:
+                future = self._loading[model_id] = Future()
+
+        if not owner:
+            return future.result()
+
+        try:
+            artifacts = self._load(model_id)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(artifacts)
+            return artifacts
+        finally:
+            with self._lock:
+                self._loading.pop(model_id, None)
+
+    def _load(self, model_id):
+        with self._load_lock:
+            rss_before = current_rss_bytes()
+            start = time.perf_counter()
+            artifacts = self.loader(model_id)
+            load_seconds = time.perf_counter() - start
+            size = max(current_rss_bytes() - rss_before, 0)
+        self.put(model_id, artifacts, size, load_seconds)
+        print(f"[Cache] Loaded {model_id} in {load_seconds:.2f}s (~{size / 2**20:.1f} MiB)")
+        return artifacts
+
+    def put(self, model_id, artifacts, size=0, load_seconds=0.0):
+        """Insert (or replace) a model and evict others until the budget is met."""
+        with self._lock:
+            self._entries[model_id] = artifacts
+            self._entries.move_to_end(model_id)
+            self._info[model_id] = {
+                "bytes": size,
+                "load_seconds": load_seconds,
+                "loaded_at": time.time(),
+                "hits": 0,
+            }
+            self._enforce_budget(keep=model_id)
+
+    def _over_budget(self):
+        if self.max_models and len(self._entries) > self.max_models:
+            return True
+        if self.max_bytes and sum(i["bytes"] for i in self._info.values()) > self.max_bytes:
+            return True
+        return False
+
+    def _enforce_budget(self, keep=None):
+        while self._over_budget():
+            victim = next(
+                (m for m in self._entries if m != keep and m not in self.pinned),
+                None,
+            )
+            if victim is None:
+                break  # everything left is pinned or just loaded
+            self._drop(victim)
+            self.evictions += 1
+            print(f"[Cache] Evicted {victim}")
+
+    def _drop(self, model_id):
+        self._entries.pop(model_id, None)
+        self._info.pop(model_id, None)
+
+    def evict(self, model_id):
+        """Remove a model from the cache; in-flight requests keep their reference."""
+        with self._lock:
+            self._drop(model_id)
+
+    def pin(self, model_id):
+        with self._lock:
+            self.pinned.add(model_id)
+
+    def unpin(self, model_id):
+        with self._lock:
+            self.pinned.discard(model_id)
+            self._enforce_budget()
+
+    def peek(self, model_id):
+        """Return cached artifacts without loading or touching LRU order."""
+        with self._lock:
+            return self._entries.get(model_id)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._info.clear()
+
+    def __contains__(self, model_id):
+        with self._lock:
+            return model_id in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "models": {
+                    model_id: dict(self._info[model_id], pinned=model_id in self.pinned)
+                    for model_id in self._entries
+                },
+                "loading": list(self._loading.keys()),
+                "total_bytes": sum(i["bytes"] for i in self._info.values()),
+                "max_bytes": self.max_bytes,
+                "max_models": self.max_models,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
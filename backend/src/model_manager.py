@@ -1,15 +1,90 @@
 import os
+import sys
+import time
+import importlib
 import joblib
-import xgboost as xgb
 import numpy as np
-from tensorflow import keras
-from .preprocessing import prepare_dataframe_from_dict
 
-import pandas as pd
-from functools import lru_cache
-from .preprocessing import prepare_dataframe_from_dict
+import threading
+from .preprocessing import (
+    prepare_dataframe_from_records, compile_preprocessor, preprocessor_fingerprint, preprocessor_output_sources,
+    NUMERIC_FEATURES, BINARY_FEATURES, CATEGORICAL_FEATURES,
+)
+from .nn_engine import DenseNet, get_weights_path
+from .artifacts import load_artifact, resolve_preprocessor_path, manifest_checksums, read_manifest, verify_manifest
+from .model_cache import ModelCache, current_rss_bytes
+from .result_cache import ResultCache, make_key
+from . import metrics
 
-MODEL_CACHE = {}
+# Models load lazily on first use. MODEL_CACHE_MAX_MODELS / MODEL_CACHE_MAX_MB cap how many
+# stay resident (0 = unlimited, least recently used is evicted first); MODEL_CACHE_PIN lists
+# model ids that are never evicted and are loaded at startup.
+MODEL_CACHE_PIN = [m.strip() for m in os.getenv("MODEL_CACHE_PIN", "").split(",") if m.strip()]
+MODEL_CACHE = ModelCache(
+    loader=lambda model_id: load_model_into_cache_entry(model_id),
+    max_models=int(os.getenv("MODEL_CACHE_MAX_MODELS", 0)),
+    max_bytes=int(float(os.getenv("MODEL_CACHE_MAX_MB", 0)) * 2**20),
+    pinned=MODEL_CACHE_PIN,
+)
+# Comma-separated model ids to load (hottest first) and warm with one dummy inference at
+# startup. Defaults to the pinned models, or every registered model if none are pinned;
+# "none" skips warm-up so every model loads on first use.
+WARMUP_MODELS = os.getenv("WARMUP_MODELS", "")
+
+# Prediction results keyed on model id + artifact version + rounded feature vector.
+# RESULT_CACHE_SIZE=0 disables it; RESULT_CACHE_DIR adds a SQLite tier shared by workers.
+RESULT_CACHE_DECIMALS = int(os.getenv("RESULT_CACHE_DECIMALS", 6))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "")
+RESULT_CACHE = ResultCache(
+    "ResultCache",
+    max_entries=int(os.getenv("RESULT_CACHE_SIZE", 10000)),
+    ttl_seconds=float(os.getenv("RESULT_CACHE_TTL", 3600)),
+    disk_path=os.path.join(RESULT_CACHE_DIR, "predictions.sqlite") if RESULT_CACHE_DIR else None,
+)
+# Every input column any shipped preprocessor reads; fixes the order of the cache key
+CACHE_KEY_FEATURES = NUMERIC_FEATURES + BINARY_FEATURES + CATEGORICAL_FEATURES + ["year"]
+
+# Heavy ML libraries are imported on demand, only when a model that needs them is loaded
+BACKEND_MODULES = {"xgboost": "xgboost", "keras": "tensorflow.keras"}
+BACKEND_IMPORT_SECONDS = {}
+
+# Startup warm-up progress, reported by /ready
+WARMUP_STATUS = {"state": "pending", "plan": [], "started_at": None, "finished_at": None, "models": {}}
+
+# Metadata for every discovered model, built once (see build_model_registry) so that
+# request handlers never have to walk the models directory.
+MODEL_REGISTRY = {}
+_REGISTRY_LOCK = threading.Lock()
+
+# Hot reload (see reload_model): last reload of each model, reported by GET /admin/reload.
+# MODEL_WATCH_INTERVAL > 0 checks the models directory for new versions every that many seconds.
+RELOAD_STATUS = {}
+_RELOAD_LOCK = threading.Lock()
+MODEL_WATCH_INTERVAL = float(os.getenv("MODEL_WATCH_INTERVAL", 0))
+_WATCHER = None
+
+# Fitted preprocessors by fingerprint; models whose preprocessors were fitted identically
+# share one instance (and one compiled copy) so an input is transformed once for all of them
+PREPROCESSORS = {}
+_PREPROCESSORS_LOCK = threading.Lock()
+
+# Use the NumPy-compiled preprocessor instead of pandas + ColumnTransformer when possible
+FAST_PREPROCESSING = os.getenv("FAST_PREPROCESSING", "1") != "0"
+
+# "numpy" serves neural nets from exported .npz weights when available (no TensorFlow);
+# "keras" always loads the .keras model
+NN_ENGINE = os.getenv("NN_ENGINE", "numpy")
+
+# Points per /predict/sweep axis when only start / stop are given
+SWEEP_DEFAULT_STEPS = int(os.getenv("SWEEP_DEFAULT_STEPS", 50))
+
+# Model ids the frontend knows how to display
+SUPPORTED_MODEL_IDS = [
+    "xgboost_regression", "xgboost_classification",
+    "randomforest_regression", "randomforest_classification",
+    "neuralnet_regression", "neuralnet_classification",
+    "linear_regression",
+]
 
 # Define the absolute path to the 'models' directory relative to this file
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -20,8 +95,6 @@ def discover_models(model_root=MODELS_DIR):
     models = {}
     for root, _, files in os.walk(model_root):
         for fname in files:
-            # Debug: Log every file found
-            print(f"[discover_models] Found file: {fname} in {root}")
             if "preprocessor" in fname or "label_encoder" in fname:
                 continue
             
@@ -64,7 +137,12 @@ def select_model(models):
 
 
 def get_preprocessor_path(model_path):
-    """Return the correct preprocessor path for a given model path."""
+    """Return the file holding the preprocessor for a given model path (see artifacts.resolve_preprocessor_path)."""
+    return resolve_preprocessor_path(_default_preprocessor_path(model_path))
+
+
+def _default_preprocessor_path(model_path):
+    """Where the training scripts save the preprocessor for a given model path."""
     preproc_dir = os.path.dirname(model_path)
     fname = os.path.basename(model_path)
     if "xg_r" in fname:
@@ -85,17 +163,35 @@ def get_preprocessor_path(model_path):
         return os.path.join(preproc_dir, "preprocessor.joblib")
 
 
+def import_backend(name):
+    """Import an ML backend module on first use and record how long the import took."""
+    module_name = BACKEND_MODULES[name]
+    if module_name not in sys.modules:
+        start = time.perf_counter()
+        importlib.import_module(module_name)
+        BACKEND_IMPORT_SECONDS[name] = time.perf_counter() - start
+        print(f"[Backend] Imported {module_name} in {BACKEND_IMPORT_SECONDS[name]:.2f}s")
+    return sys.modules[module_name]
+
+
 def load_artifacts(model_path, impute_values_path=None):
     """Load model, matching preprocessor, and impute values."""
     if model_path.endswith(".joblib"):
-        model = joblib.load(model_path)
+        if "xg_" in os.path.basename(model_path):
+            import_backend("xgboost")
+        model = load_artifact(model_path)
     elif model_path.endswith(".keras"):
-        model = keras.models.load_model(model_path)
+        weights_path = get_weights_path(model_path)
+        if NN_ENGINE == "numpy" and os.path.exists(weights_path):
+            model = DenseNet.load(weights_path)
+        else:
+            keras = import_backend("keras")
+            model = keras.models.load_model(model_path)
     else:
         raise ValueError("Unsupported model format")
 
     preproc_path = get_preprocessor_path(model_path)
-    preproc = joblib.load(preproc_path)
+    preproc = load_artifact(preproc_path)
 
     impute_values = None
     if impute_values_path and os.path.exists(impute_values_path):
@@ -104,79 +200,691 @@ def load_artifacts(model_path, impute_values_path=None):
     return model, preproc, impute_values
 
 
-@lru_cache(maxsize=1)
-def load_all_models_into_cache(model_root="models"):
+def share_preprocessor(preproc):
     """
-    Discovers all models and pre-loads them into a cache dictionary.
-    This should be called once at application startup.
+    The shared {"fingerprint", "preprocessor", "fast_preprocessor", "output_sources"} entry for a loaded
+    preprocessor; the first model to load a given fingerprint compiles it for all the others.
     """
-    if MODEL_CACHE:
-        return
+    fingerprint = preprocessor_fingerprint(preproc)
+    with _PREPROCESSORS_LOCK:
+        shared = PREPROCESSORS.get(fingerprint)
+        if shared is None:
+            shared = PREPROCESSORS[fingerprint] = {
+                "fingerprint": fingerprint,
+                "preprocessor": preproc,
+                "fast_preprocessor": compile_preprocessor(preproc) if FAST_PREPROCESSING else None,
+                # Input feature behind each transformed column, for folding explanations
+                "output_sources": preprocessor_output_sources(preproc),
+            }
+    return shared
+
+
+def get_output_schema(model_id):
+    """Describe the prediction object returned for a model id."""
+    if "classification" in model_id:
+        class_type = "str" if "neuralnet" in model_id else "int"
+        return {"class": class_type, "probability": "float"}
+    return {"predicted_popularity": "float"}
+
+
+def describe_model(model_id, model_path):
+    """A registry entry for one model with freshly resolved paths and its current artifact version."""
+    le_path = os.path.join(os.path.dirname(model_path), "label_encoder.joblib")
+    manifest = read_manifest(os.path.dirname(model_path))
+    entry = {
+        "id": model_id,
+        "label": model_id.replace("_", " ").title(),
+        "task": "classification" if "classification" in model_id else "regression",
+        "model_path": model_path,
+        "preprocessor_path": get_preprocessor_path(model_path),
+        "label_encoder_path": le_path if "neuralnet" in model_id and os.path.exists(le_path) else None,
+        "output_schema": get_output_schema(model_id),
+        "version": None,
+        "manifest_version": manifest["version"] if manifest else None,
+        "preprocessor": None,
+        "preprocessor_fingerprint": None,
+        "label_encoder": None,
+    }
+    entry["version"] = get_artifact_version(entry, manifest)
+    return entry
+
+
+def build_model_registry(model_root=MODELS_DIR):
+    """
+    Discover models once and record their paths, task type and output schema.
+    Loaded artifacts (preprocessor, label encoder) are attached when the model is first loaded.
+    """
+    with _REGISTRY_LOCK:
+        if MODEL_REGISTRY:
+            return MODEL_REGISTRY
+
+        for model_id, model_path in discover_models(model_root).items():
+            MODEL_REGISTRY[model_id] = describe_model(model_id, model_path)
+        print(f"[Registry] Registered models: {list(MODEL_REGISTRY.keys())}")
+    return MODEL_REGISTRY
+
+
+def get_artifact_file_names(entry):
+    """Names of a model's files in its directory, as listed in the manifest."""
+    names = [os.path.basename(entry["model_path"]), os.path.basename(_default_preprocessor_path(entry["model_path"]))]
+    if entry["model_path"].endswith(".keras"):
+        names.append(os.path.basename(get_weights_path(entry["model_path"])))
+    if entry["label_encoder_path"]:
+        names.append(os.path.basename(entry["label_encoder_path"]))
+    return names
+
+
+def get_artifact_version(entry, manifest=None):
+    """
+    Fingerprint of a model's files; changes whenever an artifact is replaced. Taken from the
+    checksums in the directory's manifest when it lists every file of the model, so a new
+    version is only picked up once the manifest has been rewritten; otherwise size + mtime.
+    """
+    checksums = manifest_checksums(os.path.dirname(entry["model_path"]), get_artifact_file_names(entry), manifest)
+    if checksums is not None:
+        return make_key("m", sorted(checksums.items())).split(":", 1)[1][:12]
+    paths = [entry["model_path"], entry["preprocessor_path"], entry["label_encoder_path"]]
+    if entry["model_path"].endswith(".keras"):
+        paths.append(get_weights_path(entry["model_path"]))
+    stamp = []
+    for path in paths:
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            stamp.append((os.path.basename(path), st.st_size, st.st_mtime_ns))
+    return make_key("v", stamp).split(":", 1)[1][:12]
+
+
+def get_model_entry(model_id):
+    """Return the registry entry for a model id, or None if it is unknown."""
+    return build_model_registry().get(model_id)
+
+
+def load_model_into_cache_entry(model_id):
+    """Load one registered model and build the artifacts dict stored in MODEL_CACHE."""
+    entry = get_model_entry(model_id)
+    if entry is None:
+        raise ValueError(f"Model '{model_id}' is not registered.")
+
+    fresh = describe_model(model_id, entry["model_path"])
+    if fresh["version"] != entry["version"]:
+        # Files changed on disk since they were registered: drop results from the old artifacts
+        RESULT_CACHE.invalidate(model_id)
+        with _REGISTRY_LOCK:
+            MODEL_REGISTRY[model_id] = entry = fresh
+    return load_entry_artifacts(entry)
+
 
+def load_entry_artifacts(entry):
+    """Load the files of a registry entry into an artifacts dict and attach the shared pieces to the entry."""
+    model, preproc, _ = load_artifacts(entry["model_path"])
+    shared = share_preprocessor(preproc)
+    label_encoder = load_artifact(entry["label_encoder_path"]) if entry["label_encoder_path"] else None
+    entry["preprocessor"] = shared["preprocessor"]
+    entry["preprocessor_fingerprint"] = shared["fingerprint"]
+    entry["label_encoder"] = label_encoder
+    return {
+        "model": model,
+        "preprocessor": shared["preprocessor"],
+        "fast_preprocessor": shared["fast_preprocessor"],
+        "output_sources": shared["output_sources"],
+        "preprocessor_fingerprint": shared["fingerprint"],
+        "label_encoder": label_encoder,
+        # Index -> label lookup table so decoding is a single array take
+        "label_classes": np.asarray(label_encoder.classes_) if label_encoder is not None else None,
+    }
+
+
+def check_for_updates(model_root=MODELS_DIR):
+    """Model ids whose artifacts on disk differ from the registered version, new models included."""
+    registry = build_model_registry(model_root)
+    return [
+        model_id for model_id, model_path in discover_models(model_root).items()
+        if model_id not in registry or describe_model(model_id, model_path)["version"] != registry[model_id]["version"]
+    ]
+
+
+def reload_model(model_id, model_root=MODELS_DIR):
+    """
+    Hot-reload one model from disk. The new artifacts are checked against the manifest,
+    loaded next to the old ones and warmed with a dummy inference; only then are they swapped
+    into MODEL_CACHE and the registry, and the model's cached results are dropped. Requests
+    already holding the old artifacts finish on them. A model that is not resident only gets
+    its registry entry updated and loads the new version on first use.
+    Returns the RELOAD_STATUS entry; a failed reload leaves the old version serving.
+    """
+    with _RELOAD_LOCK:
+        model_path = discover_models(model_root).get(model_id)
+        if model_path is None:
+            raise ValueError(f"Model '{model_id}' not found under {model_root}.")
+        registry = build_model_registry(model_root)
+        old = registry.get(model_id)
+        fresh = describe_model(model_id, model_path)
+        status = RELOAD_STATUS[model_id] = {
+            "state": "verifying",
+            "from_version": old["version"] if old else None,
+            "to_version": fresh["version"],
+            "manifest_version": fresh["manifest_version"],
+            "started_at": time.time(),
+        }
+        try:
+            mismatched = verify_manifest(os.path.dirname(model_path), get_artifact_file_names(fresh), model_root)
+            if mismatched:
+                raise ValueError(f"files do not match manifest.json (still being copied?): {mismatched}")
+
+            artifacts = None
+            if model_id in MODEL_CACHE or model_id in MODEL_CACHE.pinned:
+                status["state"] = "loading"
+                rss_before = current_rss_bytes()
+                start = time.perf_counter()
+                artifacts = load_entry_artifacts(fresh)
+                status["load_seconds"] = time.perf_counter() - start
+                size = max(current_rss_bytes() - rss_before, 0)
+                status["state"] = "warming"
+                start = time.perf_counter()
+                warm_artifacts(model_id, artifacts)
+                status["warmup_seconds"] = time.perf_counter() - start
+
+            # Artifacts first, registry second: a request that already keys its results on
+            # the new version can only get the new artifacts
+            if artifacts is not None:
+                MODEL_CACHE.put(model_id, artifacts, size, status["load_seconds"])
+            with _REGISTRY_LOCK:
+                MODEL_REGISTRY[model_id] = fresh
+            RESULT_CACHE.invalidate(model_id)
+            _prune_preprocessors()
+            status["state"] = "done"
+            print(f"[Reload] {model_id}: {status['from_version']} -> {status['to_version']}"
+                  + (" (swapped into cache)" if artifacts is not None else ""))
+        except Exception as e:
+            status["state"] = "failed"
+            status["error"] = str(e)
+            print(f"[Reload] Failed to reload {model_id}: {e}")
+        status["finished_at"] = time.time()
+        return status
+
+
+def reload_changed_models(model_root=MODELS_DIR):
+    """reload_model for every model check_for_updates reports; returns {model id: status}."""
+    return {model_id: reload_model(model_id, model_root) for model_id in check_for_updates(model_root)}
+
+
+def _prune_preprocessors():
+    """Drop shared preprocessors no resident model uses any more (the next load re-creates them)."""
+    in_use = set()
+    for model_id in MODEL_CACHE.keys():
+        artifacts = MODEL_CACHE.peek(model_id)
+        if artifacts is not None:
+            in_use.add(artifacts.get("preprocessor_fingerprint"))
+    with _PREPROCESSORS_LOCK:
+        for fingerprint in [f for f in PREPROCESSORS if f not in in_use]:
+            del PREPROCESSORS[fingerprint]
+
+
+def start_model_watcher(interval=None, model_root=MODELS_DIR):
+    """
+    Background thread reloading changed models every `interval` seconds (MODEL_WATCH_INTERVAL).
+    Each worker process runs its own. Returns the thread, or None if watching is off.
+    """
+    global _WATCHER
+    interval = MODEL_WATCH_INTERVAL if interval is None else interval
+    if interval <= 0 or _WATCHER is not None:
+        return _WATCHER
+
+    def watch():
+        while True:
+            time.sleep(interval)
+            try:
+                reload_changed_models(model_root)
+            except Exception as e:
+                print(f"[Reload] Watcher check failed: {e}")
+
+    _WATCHER = threading.Thread(target=watch, name="model-watcher", daemon=True)
+    _WATCHER.start()
+    print(f"[Reload] Watching {model_root} for new model versions every {interval:g}s")
+    return _WATCHER
+
+
+def get_warmup_plan(registry):
+    """Model ids to load at startup, in priority order."""
+    if WARMUP_MODELS.strip().lower() == "none":
+        return []
+    if WARMUP_MODELS.strip():
+        plan = [m.strip() for m in WARMUP_MODELS.split(",") if m.strip()]
+    else:
+        plan = list(MODEL_CACHE_PIN) or [m for m in SUPPORTED_MODEL_IDS if m in registry]
+    return [m for m in plan if m in registry]
+
+
+def warm_up_model(model_id):
+    """Load one model and run a dummy inference so lazy initialisation happens before real traffic."""
+    status = WARMUP_STATUS["models"][model_id] = {"state": "loading"}
+    try:
+        start = time.perf_counter()
+        MODEL_CACHE.get(model_id)
+        status["load_seconds"] = time.perf_counter() - start
+        status["state"] = "warming"
+        start = time.perf_counter()
+        warm_artifacts(model_id, MODEL_CACHE.get(model_id))
+        status["warmup_seconds"] = time.perf_counter() - start
+        status["state"] = "ready"
+    except Exception as e:
+        status["state"] = "failed"
+        status["error"] = str(e)
+        print(f"[Warmup] Failed to warm {model_id}: {e}")
+
+
+def warm_artifacts(model_id, model_artifacts):
+    """
+    One dummy inference straight through the preprocessor and model, so lazy initialisation
+    happens before real traffic. Skips the result cache (a hit would skip the model, and the
+    dummy row is not a real prediction) and the prediction metrics.
+    """
+    _score_matrix(_transform_records([{}], model_artifacts), model_id, model_artifacts)
+
+
+def load_all_models_into_cache(model_root=MODELS_DIR):
+    """
+    Builds the model registry and runs the startup warm-up plan (see WARMUP_MODELS).
+    Models outside the plan are loaded on first use.
+    """
     print("[Cache] Initializing model cache...")
-    discovered_paths = discover_models(model_root)
-    for model_id, model_path in discovered_paths.items():
-        print(f"[Cache] Loading model: {model_id}")
-        model, preproc, _ = load_artifacts(model_path)
-        MODEL_CACHE[model_id] = {"model": model, "preprocessor": preproc}
+    WARMUP_STATUS["state"] = "warming"
+    WARMUP_STATUS["started_at"] = time.time()
+    registry = build_model_registry(model_root)
+    WARMUP_STATUS["plan"] = get_warmup_plan(registry)
+    for model_id in WARMUP_STATUS["plan"]:
+        warm_up_model(model_id)
+    WARMUP_STATUS["finished_at"] = time.time()
+    WARMUP_STATUS["state"] = "done"
     print("[Cache] Model cache initialization complete.")
 
 
-def predict_from_features_dict(feat_dict, model_type, model_file_path):
-    """Run prediction given a feature dictionary, model type, and model path."""
+def get_readiness():
+    """Per-model load state and timings; ready once the warm-up plan has finished."""
+    registry = MODEL_REGISTRY
+    models = {}
+    for model_id in registry:
+        warm = WARMUP_STATUS["models"].get(model_id, {})
+        if model_id in MODEL_CACHE:
+            state = "ready"
+        elif warm.get("state") in ("loading", "warming", "failed"):
+            state = warm["state"]
+        else:
+            state = "not_loaded"  # loads on first request
+        models[model_id] = dict(warm, state=state)
+    started, finished = WARMUP_STATUS["started_at"], WARMUP_STATUS["finished_at"]
+    return {
+        "ready": WARMUP_STATUS["state"] == "done",
+        "warmup": {
+            "state": WARMUP_STATUS["state"],
+            "plan": WARMUP_STATUS["plan"],
+            "seconds": (finished - started) if started and finished else None,
+        },
+        "backends": BACKEND_IMPORT_SECONDS,
+        "models": models,
+    }
+
+
+def decode_class_indices(class_idx, label_classes=None):
+    """Map predicted class indices to labels with one vectorized lookup into the cached classes array."""
+    class_idx = np.asarray(class_idx, dtype=np.intp)
+    if label_classes is None:
+        return class_idx.tolist()
+    return label_classes[class_idx].tolist()
+
+
+def predict_from_features_dict(feat_dict, model_type):
+    """Run prediction given a feature dictionary and model type."""
+    return predict_batch([feat_dict], model_type)[0]
+
+
+def _canonical_value(value):
+    try:
+        # + 0.0 folds -0.0 into 0.0
+        return round(float(value), RESULT_CACHE_DECIMALS) + 0.0
+    except (TypeError, ValueError):
+        return None if value is None else str(value)
+
+
+def coerce_features(feat_dict):
+    """
+    Copy of a feature dict with every model input converted to float (None is kept as
+    missing). Raises ValueError naming the first input that is not a number.
+    """
+    out = dict(feat_dict)
+    for name in CACHE_KEY_FEATURES:
+        value = out.get(name)
+        if value is None:
+            continue
+        try:
+            out[name] = float(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"Feature '{name}' must be a number, got {value!r}.") from None
+    return out
+
+
+def prediction_cache_key(feat_dict, model_type, kind=None):
+    """
+    Cache key: model id, artifact version and the rounded feature vector in a fixed order.
+    `kind` keys other results for the same input, e.g. "explain" for explanations.
+    """
+    entry = MODEL_REGISTRY.get(model_type)
+    version = entry["version"] if entry else None
+    # Missing features count as 0, exactly as the preprocessing step fills them
+    vector = tuple(_canonical_value(feat_dict.get(f, 0)) for f in CACHE_KEY_FEATURES)
+    return make_key(f"{model_type}:{kind}" if kind else model_type, (version, vector))
+
+
+def get_cached_prediction(feat_dict, model_type):
+    """Return a cached prediction for these features, or None."""
+    if not RESULT_CACHE.enabled:
+        return None
+    result = RESULT_CACHE.get(prediction_cache_key(feat_dict, model_type))
+    if result is None:
+        return None
+    metrics.PREDICTION_ROWS.inc((model_type, "cache"))
+    return dict(result)
+
+
+def predict_batch(feature_rows, model_type, cache_lookup=True):
+    """
+    Run prediction for many feature dictionaries at once.
+    Rows found in the result cache are answered from it; the rest are transformed with a
+    single preprocessor call and scored with a single model call. Results are returned in
+    the same order as the input rows. cache_lookup=False skips the lookup (for callers that
+    already checked) but still stores the new results.
+    """
+    return predict_batch_many(feature_rows, [model_type], cache_lookup=cache_lookup)[model_type]
+
+
+def predict_batch_many(feature_rows, model_types, cache_lookup=True):
+    """
+    predict_batch for several models over the same rows; returns {model id: results}.
+    Models sharing a preprocessor fingerprint get one transform of the rows between them.
+    """
+    plan = prepare_batch_many(feature_rows, model_types, cache_lookup=cache_lookup)
+    for model_type in plan["models"]:
+        score_prepared(plan, model_type)
+    return finish_prepared(plan)
+
+
+def prepare_batch_many(feature_rows, model_types, cache_lookup=True):
+    """
+    First half of predict_batch_many: answer what the result cache can, then load the models
+    and transform the remaining rows once per preprocessor fingerprint. The returned plan is
+    scored model by model with score_prepared (safe to run concurrently, one call per model)
+    and turned into results with finish_prepared.
+    """
+    plan = {"models": {}, "transform_seconds": {}}
+    for model_type in dict.fromkeys(model_types):
+        if RESULT_CACHE.enabled and feature_rows:
+            keys = [prediction_cache_key(row, model_type) for row in feature_rows]
+            results = [RESULT_CACHE.get(key) for key in keys] if cache_lookup else [None] * len(keys)
+        else:
+            keys, results = None, [None] * len(feature_rows)
+        missing = [i for i, result in enumerate(results) if result is None]
+        plan["models"][model_type] = {"keys": keys, "results": results, "missing": missing, "X": None}
+        if len(missing) < len(results):
+            metrics.PREDICTION_ROWS.inc((model_type, "cache"), len(results) - len(missing))
+
+    # Loads each model on first use; concurrent callers share a single load
+    groups = {}
+    for model_type, job in plan["models"].items():
+        if job["missing"]:
+            job["artifacts"] = MODEL_CACHE.get(model_type)
+            fingerprint = job["artifacts"].get("preprocessor_fingerprint") or model_type
+            groups.setdefault(fingerprint, []).append((model_type, job))
+
+    for fingerprint, members in groups.items():
+        start = time.perf_counter()
+        needed = sorted(set().union(*(job["missing"] for _, job in members)))
+        X = _transform_records([feature_rows[i] for i in needed], members[0][1]["artifacts"])
+        position = {row: j for j, row in enumerate(needed)}
+        for _, job in members:
+            job["X"] = X if len(job["missing"]) == len(needed) else X[[position[i] for i in job["missing"]]]
+        seconds = plan["transform_seconds"][fingerprint] = time.perf_counter() - start
+        # One transform served every model in the group: a histogram sample each, one Server-Timing entry
+        for model_type, _ in members:
+            metrics.observe("preprocess", seconds, model_type)
+        metrics.add_timing("preprocess", seconds)
+    return plan
+
+
+def score_prepared(plan, model_type):
+    """Score one model of a prepare_batch_many plan and store its new results in the result cache."""
+    job = plan["models"][model_type]
+    if job["X"] is None:
+        return
+    with metrics.timed("infer", model_type):
+        columns = _score_matrix(job["X"], model_type, job["artifacts"])
+    metrics.PREDICTION_ROWS.inc((model_type, "model"), len(job["missing"]))
+    for i, result in zip(job["missing"], _rows_from_columns(columns)):
+        job["results"][i] = result
+        if job["keys"] is not None:
+            RESULT_CACHE.set(job["keys"][i], result, namespace=model_type)
+    job["X"] = None
+
+
+def score_prepared_timed(plan, model_type):
+    """score_prepared, returning how long the model took in seconds."""
+    start = time.perf_counter()
+    score_prepared(plan, model_type)
+    return time.perf_counter() - start
+
+
+def finish_prepared(plan):
+    """{model id: results} for a scored plan."""
+    # Copies, so callers can't mutate the cached objects
+    return {
+        model_type: [dict(result) for result in job["results"]]
+        for model_type, job in plan["models"].items()
+    }
+
+
+def explain_batch(feature_rows, model_type, cache_lookup=True):
+    """
+    Per-feature explanations (see explain.py) for many rows of a tree model, in input order:
+    {"prediction", "output", "base_value", "contributions": {input feature: value}}.
+    Works like predict_batch: cached rows are answered from the result cache, the rest are
+    transformed once and explained with one call. Explanations are cached next to the
+    predictions (same namespace, so a model reload drops both) and the predictions computed
+    along the way are cached for /predict too.
+    """
+    from .explain import supports_explanations, explanation_output, forest_for, tree_contributions, fold_contributions, explanation_rows
+
+    if not supports_explanations(model_type):
+        raise ValueError(f"Explanations are only available for tree models, not {model_type}.")
+    if RESULT_CACHE.enabled and feature_rows:
+        keys = [prediction_cache_key(row, model_type, kind="explain") for row in feature_rows]
+        results = [RESULT_CACHE.get(key) for key in keys] if cache_lookup else [None] * len(keys)
+    else:
+        keys, results = None, [None] * len(feature_rows)
+    missing = [i for i, result in enumerate(results) if result is None]
+    if len(missing) < len(results):
+        metrics.PREDICTION_ROWS.inc((model_type, "cache"), len(results) - len(missing))
+
+    if missing:
+        model_artifacts = MODEL_CACHE.get(model_type)
+        rows = [feature_rows[i] for i in missing]
+        with metrics.timed("preprocess", model_type):
+            X = _transform_records(rows, model_artifacts)
+        with metrics.timed("infer", model_type):
+            predictions = _rows_from_columns(_score_matrix(X, model_type, model_artifacts))
+        metrics.PREDICTION_ROWS.inc((model_type, "model"), len(missing))
+        with metrics.timed("explain", model_type):
+            forest = None
+            if "randomforest" in model_type:
+                forest = model_artifacts.get("forest_arrays")
+                if forest is None:
+                    forest = model_artifacts["forest_arrays"] = forest_for(model_artifacts["model"])
+            xgb = import_backend("xgboost") if "xgboost" in model_type else None
+            base_values, contribs = tree_contributions(model_artifacts["model"], X, model_type, xgb=xgb, forest=forest)
+            names, folded = fold_contributions(contribs, model_artifacts["output_sources"])
+            explanations = explanation_rows(base_values, folded, names, explanation_output(model_type))
+        for i, row, prediction, explanation in zip(missing, rows, predictions, explanations):
+            results[i] = dict(explanation, prediction=prediction)
+            if keys is not None:
+                RESULT_CACHE.set(keys[i], results[i], namespace=model_type)
+                RESULT_CACHE.set(prediction_cache_key(row, model_type), prediction, namespace=model_type)
+    # Copies, so callers can't mutate the cached objects
+    return [dict(result, prediction=dict(result["prediction"]), contributions=dict(result["contributions"]))
+            for result in results]
+
+
+def _transform_records(feature_rows, model_artifacts):
+    """One preprocessor call over all rows."""
+    fast_preproc = model_artifacts.get("fast_preprocessor")
+    if fast_preproc is not None:
+        return fast_preproc.transform_records(feature_rows)
+    preproc = model_artifacts["preprocessor"]
+    return preproc.transform(prepare_dataframe_from_records(feature_rows, preprocessor=preproc))
+
+
+def _rows_from_columns(columns):
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*columns.values())]
+
+
+def _input_feature_names(model_artifacts):
+    """Raw input columns of a model's preprocessor, in the order it expects them."""
+    fast_preproc = model_artifacts.get("fast_preprocessor")
+    if fast_preproc is not None:
+        return fast_preproc.feature_names
+    return list(model_artifacts["preprocessor"].feature_names_in_)
+
+
+def predict_frame(df, model_type):
+    """
+    Score every row of a DataFrame of raw features; returns {output column: list of values}.
+    Missing feature columns count as 0, as in predict_batch. Bypasses the result cache,
+    which is meant for repeated online requests rather than offline catalogues.
+    """
+    if len(df) == 0:
+        # sklearn estimators reject 0-sample input; an all-dropped chunk simply has no rows
+        return {name: [] for name in output_columns(model_type)}
     model_artifacts = MODEL_CACHE.get(model_type)
-    if not model_artifacts:
-        raise ValueError(f"Model '{model_type}' not found in cache. Ensure models are loaded at startup.")
+    preproc = model_artifacts["preprocessor"]
+    fast_preproc = model_artifacts.get("fast_preprocessor")
+    feature_names = _input_feature_names(model_artifacts)
+    with metrics.timed("preprocess", model_type):
+        frame = df.reindex(columns=feature_names, fill_value=0)
+        if fast_preproc is not None:
+            X = fast_preproc.transform_array(frame.to_numpy(dtype=float))
+        else:
+            X = preproc.transform(frame)
+    with metrics.timed("infer", model_type):
+        columns = _score_matrix(X, model_type, model_artifacts)
+    metrics.PREDICTION_ROWS.inc((model_type, "model"), len(X))
+    return columns
+
+
+def sweep_values(axis, max_steps=None):
+    """
+    Grid values of one sweep axis: its explicit "values", or "steps" evenly spaced points
+    from "start" to "stop" (both included).
+    """
+    if "values" in axis:
+        values = np.asarray(axis["values"], dtype=float)
+    else:
+        steps = int(axis.get("steps", SWEEP_DEFAULT_STEPS))
+        if steps < 2:
+            raise ValueError(f"Axis '{axis['feature']}' needs at least 2 steps.")
+        if max_steps and steps > max_steps:
+            raise ValueError(f"Axis '{axis['feature']}' has more than {max_steps} steps.")
+        values = np.linspace(float(axis["start"]), float(axis["stop"]), steps)
+    if values.ndim != 1 or len(values) == 0:
+        raise ValueError(f"Axis '{axis['feature']}' needs a flat list of values.")
+    if max_steps and len(values) > max_steps:
+        raise ValueError(f"Axis '{axis['feature']}' has more than {max_steps} values.")
+    return values
+
+
+def predict_sweep(base, grid, model_type):
+    """
+    Score every point of a grid over one or more features of one track.
+    `grid` is a list of (feature, values); all other inputs come from `base` (missing = 0).
+    The grid is written straight into one raw input matrix (first feature varying slowest),
+    transformed and scored in a single call. Bypasses the result cache: grid points are
+    rarely repeated and would push real predictions out of it.
+    Returns {"axes", "shape", "surface": {output column: nested lists of grid shape}}.
+    """
+    model_artifacts = MODEL_CACHE.get(model_type)
+    feature_names = _input_feature_names(model_artifacts)
+    position = {name: i for i, name in enumerate(feature_names)}
+    unknown = [feature for feature, _ in grid if feature not in position]
+    if unknown:
+        raise ValueError(f"Not an input of {model_type}: {', '.join(unknown)}")
+
+    shape = tuple(len(values) for _, values in grid)
+    with metrics.timed("preprocess", model_type):
+        raw = np.empty((int(np.prod(shape)), len(feature_names)), dtype=float)
+        raw[:] = [float(base.get(name, 0)) for name in feature_names]
+        for (feature, _), column in zip(grid, np.meshgrid(*(values for _, values in grid), indexing="ij")):
+            raw[:, position[feature]] = column.ravel()
+        fast_preproc = model_artifacts.get("fast_preprocessor")
+        if fast_preproc is not None:
+            X = fast_preproc.transform_array(raw)
+        else:
+            import pandas as pd
+            X = model_artifacts["preprocessor"].transform(pd.DataFrame(raw, columns=feature_names))
+    with metrics.timed("infer", model_type):
+        columns = _score_matrix(X, model_type, model_artifacts)
+    metrics.PREDICTION_ROWS.inc((model_type, "model"), len(X))
+    return {
+        "axes": [{"feature": feature, "values": values.tolist()} for feature, values in grid],
+        "shape": list(shape),
+        "surface": {name: np.asarray(values).reshape(shape).tolist() for name, values in columns.items()},
+    }
 
+
+def output_columns(model_type):
+    """Names of the columns _score_matrix returns for a model."""
+    if "classification" in model_type:
+        return ["class", "probability"]
+    return ["predicted_popularity"]
+
+
+def _score_matrix(X, model_type, model_artifacts):
+    """Run the model on a transformed matrix; returns {output column: list of values}."""
     model = model_artifacts["model"]
-    preproc = model_artifacts["preprocessor"]
-    
-    df = prepare_dataframe_from_dict(feat_dict, preprocessor=preproc)
-    X = preproc.transform(df)
 
     # XGBoost
     if "xgboost" in model_type and "regression" in model_type:
+        xgb = import_backend("xgboost")
         dmatrix = xgb.DMatrix(X)
-        pred = float(model.predict(dmatrix)[0])
-        return {"predicted_popularity": pred}  # <-- always return object
+        preds = model.predict(dmatrix)
+        return {"predicted_popularity": np.asarray(preds, dtype=float).tolist()}
 
     elif "xgboost" in model_type and "classification" in model_type:
-        pred_prob = model.predict_proba(X)[0][1]
-        pred_class = int(pred_prob >= 0.5)
-        return {"class": pred_class, "probability": float(pred_prob)}
+        probs = model.predict_proba(X)[:, 1]
+        return {"class": (probs >= 0.5).astype(int).tolist(), "probability": np.asarray(probs, dtype=float).tolist()}
 
     # Random Forest
     elif "randomforest" in model_type:
         if "regression" in model_type:
-            pred = float(model.predict(X)[0])
-            return {"predicted_popularity": pred}  # <-- always return object
+            preds = model.predict(X)
+            return {"predicted_popularity": np.asarray(preds, dtype=float).tolist()}
         else:
-            prob = model.predict_proba(X)[0][1]
-            pred_class = int(prob >= 0.5)
-            return {"class": pred_class, "probability": float(prob)}
+            probs = model.predict_proba(X)[:, 1]
+            return {"class": (probs >= 0.5).astype(int).tolist(), "probability": np.asarray(probs, dtype=float).tolist()}
 
     # Linear Regression
     elif "linear_regression" in model_type:
         # Standard scikit-learn regression model
-        pred = float(model.predict(X)[0])
-        return {"predicted_popularity": pred}
+        preds = model.predict(X)
+        return {"predicted_popularity": np.asarray(preds, dtype=float).tolist()}
 
     # Neural Network
     elif "neuralnet" in model_type and "regression" in model_type:
         preds = model.predict(X).flatten()
-        return {"predicted_popularity": float(preds[0])}
+        return {"predicted_popularity": np.asarray(preds, dtype=float).tolist()}
 
     elif "neuralnet" in model_type and "classification" in model_type:
-        preds_proba = model.predict(X)[0]  # shape: (num_classes,)
-        pred_class_idx = int(np.argmax(preds_proba))
-        pred_prob = float(np.max(preds_proba))
-        # Load the label encoder to get the string label
-        le_path = os.path.join(os.path.dirname(model_file_path), "label_encoder.joblib")
-        if os.path.exists(le_path):
-            le = joblib.load(le_path)
-            pred_class_label = le.inverse_transform([pred_class_idx])[0]
-            return {"class": pred_class_label, "probability": pred_prob}
-        return {"class": pred_class_idx, "probability": pred_prob}
+        preds_proba = model.predict(X)  # shape: (n_rows, num_classes)
+        pred_class_idx = np.argmax(preds_proba, axis=1)
+        pred_prob = np.max(preds_proba, axis=1)
+        labels = decode_class_indices(pred_class_idx, model_artifacts.get("label_classes"))
+        return {"class": labels, "probability": np.asarray(pred_prob, dtype=float).tolist()}
 
     else:
         raise ValueError("Unknown model type or unsupported model.")
@@ -186,11 +894,9 @@ def get_available_models():
     Returns a list of available models for the API.
     Each model should be a dict with 'id' and 'label'.
     """
-    models = discover_models()
-    # Debug: Log the models that will be sent to the frontend
-    print(f"[get_available_models] Discovered models: {list(models.keys())}")
-    # Filter discovered models to only include those supported by the frontend.
+    registry = build_model_registry()
+    # Filter registered models to only include those supported by the frontend.
     return [
-        {"id": key, "label": key.replace("_", " ").title()}
-        for key in models.keys() if key in SUPPORTED_MODEL_IDS
+        {"id": entry["id"], "label": entry["label"], "task": entry["task"]}
+        for entry in registry.values() if entry["id"] in SUPPORTED_MODEL_IDS
     ]
@@ -0,0 +1,154 @@
+# backend/src/nn_engine.py
+"""
+TensorFlow-free inference for the Dense neural networks.
+The networks built in train_regression_models.py / train_classification_models.py are
+plain Sequential stacks of Dense layers (Dropout is a no-op at inference time), so the
+forward pass is a few matrix multiplies. `export` writes the layer weights to an .npz
+next to each .keras file; DenseNet runs the forward pass with NumPy and exposes the
+same `predict(X)` call the rest of model_manager already uses for Keras models.
+
+Usage (needs TensorFlow, run from the backend directory):
+    python -m src.nn_engine export
+"""
+import os
+import glob
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", "models"))
+
+
+def _relu(x):
+    return np.maximum(x, 0, out=x)
+
+
+def _softmax(x):
+    x = x - x.max(axis=1, keepdims=True)
+    np.exp(x, out=x)
+    x /= x.sum(axis=1, keepdims=True)
+    return x
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": _relu,
+    "softmax": _softmax,
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+}
+
+
+class DenseNet:
+    """NumPy forward pass over a list of (kernel, bias, activation) layers."""
+
+    def __init__(self, layers):
+        for _, _, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation '{activation}'")
+        self.layers = [
+            (np.ascontiguousarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), activation)
+            for kernel, bias, activation in layers
+        ]
+        self.input_dim = self.layers[0][0].shape[0]
+        self.output_dim = self.layers[-1][0].shape[1]
+
+    @classmethod
+    def load(cls, path):
+        """Load weights written by export_dense_weights (memory-mapped if src.artifacts converted them)."""
+        from .artifacts import load_mapped
+        mapped = load_mapped(path)
+        if mapped is not None:
+            return cls._from_arrays(mapped)
+        with np.load(path, allow_pickle=False) as data:
+            return cls._from_arrays(data)
+
+    @classmethod
+    def _from_arrays(cls, data):
+        activations = [str(a) for a in data["activations"]]
+        layers = [
+            (data[f"kernel_{i}"], data[f"bias_{i}"], activation)
+            for i, activation in enumerate(activations)
+        ]
+        return cls(layers)
+
+    def __call__(self, X):
+        out = np.asarray(X, dtype=np.float32)
+        if out.ndim == 1:
+            out = out.reshape(1, -1)
+        for kernel, bias, activation in self.layers:
+            out = out @ kernel
+            out += bias
+            out = ACTIVATIONS[activation](out)
+        return out
+
+    def predict(self, X, **kwargs):
+        """Keras-compatible alias so callers can treat DenseNet like a keras Model."""
+        return self(X)
+
+
+def get_weights_path(keras_path):
+    """The .npz file exported alongside a .keras model."""
+    return os.path.splitext(keras_path)[0] + ".npz"
+
+
+def extract_dense_layers(model):
+    """Pull (kernel, bias, activation) from every Dense layer of a Sequential keras model."""
+    layers = []
+    for layer in model.layers:
+        kind = type(layer).__name__
+        if kind in ("Dropout", "InputLayer"):
+            continue
+        if kind != "Dense":
+            raise ValueError(f"Layer '{layer.name}' of type {kind} cannot be exported")
+        weights = layer.get_weights()
+        kernel = weights[0]
+        bias = weights[1] if len(weights) > 1 else np.zeros(kernel.shape[1], dtype=kernel.dtype)
+        layers.append((kernel, bias, layer.get_config().get("activation", "linear")))
+    return layers
+
+
+def export_dense_weights(model, out_path):
+    """Write a keras model's Dense weights to out_path (.npz) and return the DenseNet."""
+    layers = extract_dense_layers(model)
+    arrays = {"activations": np.array([activation for _, _, activation in layers])}
+    for i, (kernel, bias, _) in enumerate(layers):
+        arrays[f"kernel_{i}"] = kernel
+        arrays[f"bias_{i}"] = bias
+    np.savez(out_path, **arrays)
+    return DenseNet(layers)
+
+
+def verify_against_keras(model, net, n_samples=512, seed=0, atol=1e-4):
+    """Compare DenseNet outputs with keras model.predict on random inputs; returns max abs diff."""
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_samples, net.input_dim)).astype(np.float32)
+    expected = model.predict(X, verbose=0)
+    max_diff = float(np.max(np.abs(expected - net(X))))
+    if max_diff > atol:
+        raise AssertionError(f"NumPy forward pass differs from keras by {max_diff}")
+    return max_diff
+
+
+def export_all(model_root=MODELS_DIR):
+    """Export every .keras model under model_root and check it against keras."""
+    from tensorflow import keras
+
+    for keras_path in sorted(glob.glob(os.path.join(model_root, "**", "*.keras"), recursive=True)):
+        model = keras.models.load_model(keras_path)
+        out_path = get_weights_path(keras_path)
+        net = export_dense_weights(model, out_path)
+        max_diff = verify_against_keras(model, net)
+        print(f"[nn_engine] Exported {keras_path} -> {out_path} (max diff vs keras: {max_diff:.2e})")
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "export"
+    if command != "export":
+        print("Usage: python -m src.nn_engine export [models_dir]")
+        sys.exit(1)
+    export_all(sys.argv[2] if len(sys.argv) > 2 else MODELS_DIR)
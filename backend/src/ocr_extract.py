@@ -1,132 +1,331 @@
 # backend/src/ocr_extract.py
-import re
+import io
 from PIL import Image
-import easyocr
+import numpy as np
 import os
+import hashlib
+import threading
+from collections import OrderedDict
+from .ocr_parser import parse_features_text
+from . import metrics
+
+# Upload limits, checked from the image header before any pixel data is decoded
+OCR_MAX_BYTES = int(os.getenv("OCR_MAX_BYTES", 10 * 1024 * 1024))
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", 25_000_000))
+
+# "full" runs EasyOCR detection on the whole frame; "roi" recognizes only the stats lines of the
+# screenshot (opt-in until its accuracy has been checked against full-frame OCR)
+OCR_MODE = os.getenv("OCR_MODE", "full")
+# A layout is only learned if at least this many stats rows were read from it
+OCR_ROI_MIN_ROWS = int(os.getenv("OCR_ROI_MIN_ROWS", 4))
+OCR_LAYOUT_CACHE_SIZE = int(os.getenv("OCR_LAYOUT_CACHE_SIZE", 32))
+
+# Label stems that mark a line as part of the stats panel (stems tolerate small OCR slips)
+STAT_LABELS = (
+    "length", "duration", "tempo", "loud", "key", "camelot", "explicit", "popular",
+    "happi", "valence", "dance", "energ", "acoustic", "instrument", "live", "speech",
+)
+
+# Content-addressed cache of OCR results, keyed on the uploaded bytes. OCR_CACHE_SIZE=0 disables
+# it; OCR_CACHE_DIR adds a SQLite tier shared by workers and kept across restarts.
+OCR_CACHE_SIZE = int(os.getenv("OCR_CACHE_SIZE", 1000))
+OCR_CACHE_TTL = float(os.getenv("OCR_CACHE_TTL", 86400))
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", "")
+OCR_CACHE = None
+
+# (width, height) -> row boxes [x_min, x_max, y_min, y_max] of the stats lines for that layout
+LAYOUT_TEMPLATES = OrderedDict()
+_LAYOUT_LOCK = threading.Lock()
 
 # LAZY LOADING: Initialize the reader only when it's first needed to save memory at startup.
+# easyocr (and torch) is imported there too, so importing this module stays cheap.
 EASYOCR_READER = None
 
 def get_easyocr_reader():
     global EASYOCR_READER
     if EASYOCR_READER is None:
+        import easyocr
         EASYOCR_READER = easyocr.Reader(["en"], gpu=False)
     return EASYOCR_READER
 
+def warm_ocr_worker():
+    """Build the reader in this process (used to pre-start pool workers); returns the worker pid."""
+    get_easyocr_reader()
+    return os.getpid()
+
+def init_ocr_worker():
+    """
+    Process-pool initializer: build the reader as soon as a worker starts, not on its first job.
+    Errors are only logged here; an exception in an initializer would break the whole pool,
+    while the same error raised from the first real job is reported to that caller.
+    """
+    try:
+        warm_ocr_worker()
+    except Exception as e:
+        print(f"[OCR] Reader warm-up failed in worker {os.getpid()}: {e}")
+
 def extract_features_from_text(text: str) -> dict:
-    print("RAW OCR TEXT:\n", text)  # Debug print
-    text = text.lower()
-    out = {}
-    # Improved key extraction: match "F# Major", "Gb Major", "F#IGb Major", etc.
-    key_match = re.search(r"\b([a-g][#b]?)\w*\s*(major|minor)\b", text)
-    if key_match:
-        note = key_match.group(1).strip().upper()
-        scale = key_match.group(2).lower()
-        out["key_str"] = f"{note} {scale}".strip()
-    # Explicit, happiness, loudness (unchanged)
-    explicit_match = re.search(r"explicit[:;\s]*(yes|no)", text)
-    if explicit_match:
-        out["explicit_str"] = explicit_match.group(1).strip()
-    happiness_match = re.search(r"happiness[:;\s]*([0-9]+)", text)
-    if happiness_match:
-        out["happiness"] = float(happiness_match.group(1))
-    loudness_match = re.search(r"loudness[:;\s]*([-+]?\d+\.?\d*)\s*d?b?", text)
-    if loudness_match:
-        out["loudness"] = float(loudness_match.group(1))
-    # --- Duration/Length handling ---
-    # 1. mm:ss (colon)
-    length_match_colon = re.search(r"(length|duration)[:;\s]*([0-9]+):([0-9]+)", text)
-    if length_match_colon:
-        mm, ss = length_match_colon.group(2), length_match_colon.group(3)
-        out["duration_min"] = float(mm) + float(ss)/60.0
-    else:
-        # 2. m.ss (dot, where .ss is seconds, NOT decimal)
-        length_match_dot = re.search(r"(length|duration)[:;\s]*([0-9]+)\.([0-9]{1,2})", text)
-        if length_match_dot:
-            mm, ss = length_match_dot.group(2), length_match_dot.group(3)
-            # treat .ss as seconds, not decimal
-            out["duration_min"] = float(mm) + float(ss)/60.0
-
-    # Remove any fallback that treats a single float as decimal minutes for duration/length!
-    # --- Rest of your float extraction logic (unchanged) ---
-    float_pattern = r"([a-zA-Z %]+?)[:\s]*([-+]?\d*\.\d+|\d+[:\d]*)"
-    matches = re.findall(float_pattern, text)
-    for k, v in matches:
-        key = k.strip()
-        val = v.strip()
-        try:
-            if ":" in val:  # duration mm:ss matched as "mm:ss"
-                mm, ss = val.split(":")
-                val_num = float(mm) + float(ss)/60.0
-                out["duration_min"] = val_num
-                continue
-            # Only treat as decimal if not length/duration
-            if ("duration" in key or "length" in key):
-                # If it matches m.ss, already handled above, so skip
-                continue
-            val_num = float(val)
-        except:
+    """Parse OCR text into raw features (see ocr_parser for the single-pass parser)."""
+    return parse_features_text(text)
+
+class ImageTooLargeError(ValueError):
+    """Raised when an upload exceeds OCR_MAX_BYTES or OCR_MAX_PIXELS."""
+
+
+def check_image_limits(data: bytes):
+    """
+    Validate an encoded image against the byte and pixel limits without decoding it.
+    Returns (width, height); raises ImageTooLargeError, or ValueError for non-images.
+    """
+    if len(data) > OCR_MAX_BYTES:
+        raise ImageTooLargeError(f"Image is {len(data)} bytes; the limit is {OCR_MAX_BYTES}.")
+    try:
+        # Image.open only parses the header; pixels are decoded lazily
+        with Image.open(io.BytesIO(data)) as img:
+            width, height = img.size
+    except Exception as e:
+        raise ValueError(f"Unreadable image: {e}")
+    if width * height > OCR_MAX_PIXELS:
+        raise ImageTooLargeError(f"Image is {width}x{height} pixels; the limit is {OCR_MAX_PIXELS}.")
+    return width, height
+
+
+def decode_image(data: bytes) -> np.ndarray:
+    """Decode encoded image bytes into an RGB uint8 array, enforcing the upload limits first."""
+    check_image_limits(data)
+    with Image.open(io.BytesIO(data)) as img:
+        return np.asarray(img.convert("RGB"))
+
+
+def to_ocr_input(image):
+    """Accept a file path, encoded bytes, a PIL image or a NumPy array; return an RGB uint8 array."""
+    if isinstance(image, str):
+        with open(image, "rb") as f:
+            return decode_image(f.read())
+    if isinstance(image, (bytes, bytearray, memoryview)):
+        return decode_image(bytes(image))
+    if isinstance(image, Image.Image):
+        return np.asarray(image.convert("RGB"))
+    if isinstance(image, np.ndarray):
+        return image
+    raise TypeError(f"Unsupported image input: {type(image).__name__}")
+
+
+def get_ocr_cache():
+    """The OCR result cache, created on first use (so OCR worker processes never open it)."""
+    global OCR_CACHE
+    if OCR_CACHE is None:
+        from .result_cache import ResultCache
+        OCR_CACHE = ResultCache(
+            "OCRCache",
+            max_entries=OCR_CACHE_SIZE,
+            ttl_seconds=OCR_CACHE_TTL,
+            disk_path=os.path.join(OCR_CACHE_DIR, "ocr.sqlite") if OCR_CACHE_DIR else None,
+        )
+    return OCR_CACHE
+
+
+def image_cache_key(data: bytes) -> str:
+    """
+    Cache key for an encoded image: a hash of the bytes as uploaded. Cheap enough for the
+    event loop (no decode), so a cache lookup never bypasses the OCR pool's queue limits; a
+    re-encoded copy of a screenshot is simply a miss.
+    """
+    from .result_cache import make_key
+    return make_key("ocr", hashlib.sha256(data).hexdigest())
+
+
+def find_text_lines(image):
+    """
+    Cheap text-line detector (no neural network): binarize with enhance_image_for_ocr, smear
+    characters into lines with a wide dilation and return line boxes [x_min, x_max, y_min, y_max]
+    in the image's own pixel coordinates.
+    """
+    import cv2
+    from .utils import enhance_image_for_ocr
+
+    binary = np.asarray(enhance_image_for_ocr(Image.fromarray(image)).convert("L"))
+    bin_height, bin_width = binary.shape
+    scale = image.shape[1] / bin_width  # enhance_image_for_ocr upscales small images
+    ink = np.where(binary < 128, 255, 0).astype(np.uint8)
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, bin_width // 60), 3))
+    contours, _ = cv2.findContours(cv2.dilate(ink, kernel), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    lines = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        # Text lines are short and wider than tall; this drops borders, icons and large panels
+        if h < 8 or h > bin_height / 10 or w < h:
             continue
-        if "dance" in key:
-            out["danceability"] = val_num
-        elif "energy" in key:
-            out["energy"] = val_num
-        elif key.strip() == "key":
-            out["key"] = int(val_num)
-        elif "loud" in key:
-            out["loudness"] = val_num
-        elif "speech" in key:
-            out["speechiness"] = val_num
-        elif "acoustic" in key:
-            out["acousticness"] = val_num
-        elif "instrument" in key:
-            out["instrumentalness"] = val_num
-        elif "liveness" in key:
-            out["liveness"] = val_num
-        elif "valence" in key:
-            out["valence"] = val_num
-        elif "tempo" in key:
-            out["tempo"] = val_num
-        elif "duration" in key or "length" in key:
-            # Only treat as decimal if not already handled above
-            if val_num > 1000:
-                out["duration_min"] = val_num / 60000.0
-            elif val_num > 120:
-                out["duration_min"] = val_num / 60.0
-            else:
-                out["duration_min"] = val_num
-    return out
+        lines.append([
+            int(x * scale), int(np.ceil((x + w) * scale)),
+            int(y * scale), int(np.ceil((y + h) * scale)),
+        ])
+    return lines
 
-def extract_from_image(image_path_or_pil):
-    # Accept PIL Image or path
-    tmp_path = None
-    if isinstance(image_path_or_pil, str):
-        reader = get_easyocr_reader()
-        res = reader.readtext(image_path_or_pil, detail=0)
-        text = "\n".join(res)
-    else:
-        # PIL Image
-        pil_img = image_path_or_pil
-        tmp_path = "tmp_ocr.png"
-        pil_img.save(tmp_path)
-        reader = get_easyocr_reader()
-        res = reader.readtext(tmp_path, detail=0)
-        text = "\n".join(res)
-    if tmp_path and os.path.exists(tmp_path):
-        try:
-            os.remove(tmp_path)
-        except:
-            pass
-    features = extract_features_from_text(text)
+
+def _group_rows(lines):
+    """Merge (box, text) lines whose vertical extents overlap into rows, top to bottom."""
+    rows = []
+    for box, text in sorted(lines, key=lambda line: (line[0][2], line[0][0])):
+        if rows:
+            row_box, row_texts = rows[-1]
+            overlap = min(row_box[3], box[3]) - max(row_box[2], box[2])
+            if overlap > 0.5 * min(row_box[3] - row_box[2], box[3] - box[2]):
+                row_box[:] = [min(row_box[0], box[0]), max(row_box[1], box[1]),
+                              min(row_box[2], box[2]), max(row_box[3], box[3])]
+                row_texts.append(text)
+                continue
+        rows.append((list(box), [text]))
+    return [(box, " ".join(t for t in texts if t)) for box, texts in rows]
+
+
+def _is_stats_row(text):
+    text = text.lower()
+    return any(label in text for label in STAT_LABELS)
+
+
+def _recognize_boxes(reader, image, boxes):
+    """EasyOCR recognition only (detection skipped) on the given boxes; returns [(box, text)]."""
+    if not boxes:
+        return []
+    results = reader.recognize(image, horizontal_list=boxes, free_list=[], detail=1)
+    lines = []
+    for points, text, _ in results:
+        xs = [int(p[0]) for p in points]
+        ys = [int(p[1]) for p in points]
+        lines.append(([min(xs), max(xs), min(ys), max(ys)], text))
+    return lines
+
+
+def _build_template(rows, width):
+    """Row boxes for a layout, widened to the panel so longer values still fit on other tracks."""
+    x_min = min(box[0] for box, _ in rows)
+    x_max = max(box[1] for box, _ in rows)
+    x_max = min(width, x_max + (x_max - x_min) // 2)
+    return [[max(0, x_min - 4), x_max, max(0, box[2] - 2), box[3] + 2] for box, _ in rows]
+
+
+def read_stats_text(image):
+    """
+    Layout-aware OCR of the stats panel. Recognizes only the rows of a cached template for
+    this screenshot size; on a new layout it finds text lines with the cheap OpenCV pass and
+    learns the template from the rows carrying stats labels. A template is only used if every
+    one of its rows still reads as a stats row; otherwise it is dropped (the next screenshot
+    learns the layout again) and None is returned, as it is when no stats panel is found, so
+    the caller falls back to full-frame OCR rather than parsing a partial panel.
+    """
+    reader = get_easyocr_reader()
+    height, width = image.shape[:2]
+    layout = (width, height)
+
+    with _LAYOUT_LOCK:
+        template = LAYOUT_TEMPLATES.get(layout)
+        if template is not None:
+            LAYOUT_TEMPLATES.move_to_end(layout)
+    if template is not None:
+        rows = [row for row in _recognize_boxes(reader, image, template) if _is_stats_row(row[1])]
+        if len(rows) == len(template):
+            return "\n".join(text for _, text in rows)
+        with _LAYOUT_LOCK:
+            LAYOUT_TEMPLATES.pop(layout, None)  # the page shifted; learn it again next time
+        return None
+
+    lines = _recognize_boxes(reader, image, find_text_lines(image))
+    rows = [row for row in _group_rows(lines) if _is_stats_row(row[1])]
+    if len(rows) < OCR_ROI_MIN_ROWS:
+        return None
+    with _LAYOUT_LOCK:
+        LAYOUT_TEMPLATES[layout] = _build_template(rows, width)
+        while len(LAYOUT_TEMPLATES) > OCR_LAYOUT_CACHE_SIZE:
+            LAYOUT_TEMPLATES.popitem(last=False)
+    print(f"[OCR] Learned stats layout for {width}x{height} screenshots ({len(rows)} rows)")
+    return "\n".join(text for _, text in rows)
+
+
+def extract_from_image(image):
+    """Run OCR on an image (path, bytes, PIL image or array) entirely in memory."""
+    with metrics.timed("ocr_decode"):
+        image = to_ocr_input(image)
+    with metrics.timed("ocr_recognize"):
+        text = read_stats_text(image) if OCR_MODE == "roi" else None
+        if text is None:
+            reader = get_easyocr_reader()
+            res = reader.readtext(image, detail=0)
+            text = "\n".join(res)
+    with metrics.timed("ocr_parse"):
+        features = extract_features_from_text(text)
     return features
 
-def extract_features_from_image(image_path):
+def extract_features_from_image(image):
+    """
+    Wrapper for API to extract features from an uploaded image (bytes) or file path.
+    """
+    return extract_from_image(image)
+
+def extract_features_timed(image):
+    """
+    extract_features_from_image returning (features, stage timings) for OCR pool workers:
+    their timings are recorded in the API process, which serves /metrics.
+    """
+    return metrics.collect_timings(extract_from_image, image)
+
+def extract_features_from_file(path):
+    """Read an image file as bytes (so the upload limits apply) and extract its features."""
+    with open(path, "rb") as f:
+        return extract_from_image(f.read())
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif", ".tif", ".tiff")
+
+def collect_image_paths(paths):
+    """Expand directories into their image files (sorted), keeping the given order otherwise."""
+    out = []
+    for path in paths:
+        if os.path.isdir(path):
+            out.extend(
+                os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.lower().endswith(IMAGE_EXTENSIONS)
+            )
+        else:
+            out.append(path)
+    return out
+
+def _extract_indexed(index, path):
+    try:
+        return {"index": index, "path": path, "features": extract_features_from_file(path)}
+    except Exception as e:
+        return {"index": index, "path": path, "error": str(e)}
+
+def extract_many(paths, workers=1, stream=False):
     """
-    Wrapper for API to extract features from an image file path.
+    OCR many images on a pool of pre-warmed reader processes.
+    Yields one result dict per image: in input order, or as each finishes when stream=True.
     """
-    return extract_from_image(image_path)
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_ocr_worker) as pool:
+        futures = [pool.submit(_extract_indexed, i, path) for i, path in enumerate(paths)]
+        for future in (as_completed(futures) if stream else futures):
+            yield future.result()
 
 if __name__ == "__main__":
-    import sys
-    fp = sys.argv[1]
-    print(extract_from_image(fp))
+    # python -m src.ocr_extract image.png
+    # python -m src.ocr_extract screenshots/ more.png --workers 4 [--stream]
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Extract audio features from Chosic/Spotify screenshots.")
+    parser.add_argument("paths", nargs="+", help="Image files or directories of images")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="OCR worker processes")
+    parser.add_argument("--stream", action="store_true", help="Print JSON lines as each image finishes")
+    args = parser.parse_args()
+
+    image_paths = collect_image_paths(args.paths)
+    if len(image_paths) == 1 and not args.stream:
+        print(extract_from_image(image_paths[0]))
+    else:
+        workers = max(1, min(args.workers, len(image_paths)))
+        if args.stream:
+            for result in extract_many(image_paths, workers=workers, stream=True):
+                print(json.dumps(result), flush=True)
+        else:
+            print(json.dumps(list(extract_many(image_paths, workers=workers)), indent=2))
@@ -0,0 +1,287 @@
+# backend/src/ocr_parser.py
+"""
+Parser that turns OCR'd screenshot text into raw audio features.
+`parse_features_text` gives the same output as the original regex chain, which is kept
+below as `legacy_extract_features_from_text` and is the reference for the golden corpus.
+Differences from the original:
+  * every pattern is compiled once at import;
+  * the generic "label: value" scan is a single linear pass. The label must start where a
+    run of label characters starts, so a label that has no value is skipped at once instead of
+    being retried from each of its characters;
+  * label -> feature dispatch is memoized (OCR produces the same few labels over and over);
+  * fixed-label lookups are skipped when the label text is not present, and nothing is printed.
+
+Usage (run from the backend directory):
+    python -m src.ocr_parser check    # compare against the golden corpus and the legacy parser
+    python -m src.ocr_parser bench    # microbenchmark new vs legacy
+    python -m src.ocr_parser update   # regenerate the golden corpus from the legacy parser
+"""
+import os
+import re
+import json
+import random
+from functools import lru_cache
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+GOLDEN_CORPUS_PATH = os.path.normpath(os.path.join(BASE_DIR, "..", "data", "ocr_golden_corpus.json"))
+
+_KEY_RE = re.compile(r"\b([a-g][#b]?)\w*\s*(major|minor)\b")
+_EXPLICIT_RE = re.compile(r"explicit[:;\s]*(yes|no)")
+_HAPPINESS_RE = re.compile(r"happiness[:;\s]*([0-9]+)")
+_LOUDNESS_RE = re.compile(r"loudness[:;\s]*([-+]?\d+\.?\d*)")
+_LENGTH_COLON_RE = re.compile(r"(length|duration)[:;\s]*([0-9]+):([0-9]+)")
+_LENGTH_DOT_RE = re.compile(r"(length|duration)[:;\s]*([0-9]+)\.([0-9]{1,2})")
+# Same tokens as the original r"([a-zA-Z %]+?)[:\s]*(...)" findall. A match can only begin where
+# a run of label characters begins (every later start in the run shares the same suffix, so it
+# fails too), and a greedy label differs from the lazy one only by trailing spaces, which are
+# stripped anyway.
+_TOKEN_RE = re.compile(r"(?<![a-zA-Z %])([a-zA-Z %]+)[:\s]*([-+]?\d*\.\d+|\d+[:\d]*)")
+
+# Checked in order after "dance", "energy" and an exact "key", like the original if/elif chain
+_LABEL_STEMS = (
+    ("loud", "loudness"),
+    ("speech", "speechiness"),
+    ("acoustic", "acousticness"),
+    ("instrument", "instrumentalness"),
+    ("liveness", "liveness"),
+    ("valence", "valence"),
+    ("tempo", "tempo"),
+)
+
+
+@lru_cache(maxsize=1024)
+def _feature_for_label(label):
+    """Feature name for a stripped label ('key' for the integer key column), or None."""
+    if "dance" in label:
+        return "danceability"
+    if "energy" in label:
+        return "energy"
+    if label == "key":
+        return "key"
+    for stem, feature in _LABEL_STEMS:
+        if stem in label:
+            return feature
+    return None
+
+
+def parse_features_text(text: str) -> dict:
+    """Extract raw features (0-100 percentages, key_str, explicit_str, ...) from OCR text."""
+    text = text.lower()
+    out = {}
+    if "major" in text or "minor" in text:
+        key_match = _KEY_RE.search(text)
+        if key_match:
+            out["key_str"] = f"{key_match.group(1).strip().upper()} {key_match.group(2)}".strip()
+    if "explicit" in text:
+        explicit_match = _EXPLICIT_RE.search(text)
+        if explicit_match:
+            out["explicit_str"] = explicit_match.group(1).strip()
+    if "happiness" in text:
+        happiness_match = _HAPPINESS_RE.search(text)
+        if happiness_match:
+            out["happiness"] = float(happiness_match.group(1))
+    if "loudness" in text:
+        loudness_match = _LOUDNESS_RE.search(text)
+        if loudness_match:
+            out["loudness"] = float(loudness_match.group(1))
+    if "length" in text or "duration" in text:
+        # mm:ss, else m.ss where .ss is seconds (not a decimal fraction)
+        length_match = _LENGTH_COLON_RE.search(text) or _LENGTH_DOT_RE.search(text)
+        if length_match:
+            out["duration_min"] = float(length_match.group(2)) + float(length_match.group(3)) / 60.0
+
+    for match in _TOKEN_RE.finditer(text):
+        label = match.group(1).strip()
+        value = match.group(2).strip()
+        if ":" in value:
+            # A mm:ss value under any label is a duration
+            parts = value.split(":")
+            if len(parts) == 2 and parts[0] and parts[1]:
+                out["duration_min"] = float(parts[0]) + float(parts[1]) / 60.0
+            continue
+        if "duration" in label or "length" in label:
+            continue  # already handled above
+        feature = _feature_for_label(label)
+        if feature is None:
+            continue
+        number = float(value)
+        out[feature] = int(number) if feature == "key" else number
+    return out
+
+
+def legacy_extract_features_from_text(text: str) -> dict:
+    """The original multi-regex parser (minus its debug print); the reference for the golden corpus."""
+    text = text.lower()
+    out = {}
+    # Improved key extraction: match "F# Major", "Gb Major", "F#IGb Major", etc.
+    key_match = re.search(r"\b([a-g][#b]?)\w*\s*(major|minor)\b", text)
+    if key_match:
+        note = key_match.group(1).strip().upper()
+        scale = key_match.group(2).lower()
+        out["key_str"] = f"{note} {scale}".strip()
+    # Explicit, happiness, loudness (unchanged)
+    explicit_match = re.search(r"explicit[:;\s]*(yes|no)", text)
+    if explicit_match:
+        out["explicit_str"] = explicit_match.group(1).strip()
+    happiness_match = re.search(r"happiness[:;\s]*([0-9]+)", text)
+    if happiness_match:
+        out["happiness"] = float(happiness_match.group(1))
+    loudness_match = re.search(r"loudness[:;\s]*([-+]?\d+\.?\d*)\s*d?b?", text)
+    if loudness_match:
+        out["loudness"] = float(loudness_match.group(1))
+    # --- Duration/Length handling ---
+    # 1. mm:ss (colon)
+    length_match_colon = re.search(r"(length|duration)[:;\s]*([0-9]+):([0-9]+)", text)
+    if length_match_colon:
+        mm, ss = length_match_colon.group(2), length_match_colon.group(3)
+        out["duration_min"] = float(mm) + float(ss)/60.0
+    else:
+        # 2. m.ss (dot, where .ss is seconds, NOT decimal)
+        length_match_dot = re.search(r"(length|duration)[:;\s]*([0-9]+)\.([0-9]{1,2})", text)
+        if length_match_dot:
+            mm, ss = length_match_dot.group(2), length_match_dot.group(3)
+            # treat .ss as seconds, not decimal
+            out["duration_min"] = float(mm) + float(ss)/60.0
+
+    # Remove any fallback that treats a single float as decimal minutes for duration/length!
+    # --- Rest of your float extraction logic (unchanged) ---
+    float_pattern = r"([a-zA-Z %]+?)[:\s]*([-+]?\d*\.\d+|\d+[:\d]*)"
+    matches = re.findall(float_pattern, text)
+    for k, v in matches:
+        key = k.strip()
+        val = v.strip()
+        try:
+            if ":" in val:  # duration mm:ss matched as "mm:ss"
+                mm, ss = val.split(":")
+                val_num = float(mm) + float(ss)/60.0
+                out["duration_min"] = val_num
+                continue
+            # Only treat as decimal if not length/duration
+            if ("duration" in key or "length" in key):
+                # If it matches m.ss, already handled above, so skip
+                continue
+            val_num = float(val)
+        except:
+            continue
+        if "dance" in key:
+            out["danceability"] = val_num
+        elif "energy" in key:
+            out["energy"] = val_num
+        elif key.strip() == "key":
+            out["key"] = int(val_num)
+        elif "loud" in key:
+            out["loudness"] = val_num
+        elif "speech" in key:
+            out["speechiness"] = val_num
+        elif "acoustic" in key:
+            out["acousticness"] = val_num
+        elif "instrument" in key:
+            out["instrumentalness"] = val_num
+        elif "liveness" in key:
+            out["liveness"] = val_num
+        elif "valence" in key:
+            out["valence"] = val_num
+        elif "tempo" in key:
+            out["tempo"] = val_num
+        elif "duration" in key or "length" in key:
+            # Only treat as decimal if not already handled above
+            if val_num > 1000:
+                out["duration_min"] = val_num / 60000.0
+            elif val_num > 120:
+                out["duration_min"] = val_num / 60.0
+            else:
+                out["duration_min"] = val_num
+    return out
+
+
+# --- Golden corpus -----------------------------------------------------------------------
+
+# Lines as EasyOCR returns them for Chosic / Spotify-style stats panels, including common misreads
+_CORPUS_LINES = [
+    "Track Analysis", "Length: 3:01", "Tempo: 133 bpm", "Loudness: -9 db", "Key: F#/Gb Major",
+    "Key: F#/G♭ Major", "Key: C Minor", "Key: A#IBb minor", "Key: E Major", "Camelot: 2B", "Camelot: 11A",
+    "Explicit: Yes", "Explicit: No", "Explicit; no", "Popularity: 4/100", "Happiness: 39/100",
+    "Danceability: 44/100", "Energy: 78/100", "Acousticness: 1/100", "Instrumentalness: 1/100",
+    "Liveness: 12/100", "Speechiness: 6/100", "Valence: 0.39", "Danceability 0.512", "Energy 0.8",
+    "Loudness -5.2 dB", "Loudness; -11", "Loudness: +3", "Tempo 98.004", "Tempo: 120", "Duration: 3.45",
+    "Duration: 215000", "Length 4:5", "Length: 12:30", "Duration 10:07:33", "Key 7", "Key: 11", "Mode: 1",
+    "Acoustic 23%", "Speech 0.05", "Instrumental 88", "Live 0.1", "Time Signature: 4", "BPM: 128",
+    "Length: 3:01  Tempo: 133 bpm  Loudness: -9 db", "Key: F#/Gb Major  Camelot: 2B  Explicit: Yes",
+    "Energy:78/100Danceability:44/100", "Happiness 39 Energy 78", "dance ability: 5", "energy: .75",
+    "tempo: 1.2.3", "popularity: 100/100", "3:01", "-9 db", "Major", "Track Analysis Length: 2:59",
+    "", " ", "%", "::", "100 %", "Loudness:", "Happiness:", "Speechiness: 6/100 Liveness: 12/100",
+]
+
+
+def build_corpus_texts(n_random=400, seed=0):
+    """Deterministic corpus: the real screenshot text, each line alone, and random line mixes."""
+    texts = ["\n".join(_CORPUS_LINES[:22])]
+    texts.extend(_CORPUS_LINES)
+    rng = random.Random(seed)
+    for _ in range(n_random):
+        lines = rng.sample(_CORPUS_LINES, rng.randint(2, 14))
+        texts.append(rng.choice(["\n", " ", "  ", "\n\n"]).join(lines))
+    return texts
+
+
+def write_golden_corpus(path=GOLDEN_CORPUS_PATH):
+    """Record the legacy parser's output for every corpus text."""
+    corpus = [{"text": t, "features": legacy_extract_features_from_text(t)} for t in build_corpus_texts()]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(corpus, f, indent=1, ensure_ascii=False)
+    return len(corpus)
+
+
+def check_golden_corpus(path=GOLDEN_CORPUS_PATH, n_fuzz=5000, seed=1):
+    """Return a list of mismatches vs the golden corpus and vs the legacy parser on fuzzed texts."""
+    with open(path, encoding="utf-8") as f:
+        corpus = json.load(f)
+    mismatches = []
+    for item in corpus:
+        got = parse_features_text(item["text"])
+        if got != item["features"] or list(got) != list(item["features"]):
+            mismatches.append({"text": item["text"], "expected": item["features"], "got": got})
+    rng = random.Random(seed)
+    alphabet = "abcdeghklmnoprstuyz #%:;.-+/\n0123456789"
+    for _ in range(n_fuzz):
+        lines = rng.sample(_CORPUS_LINES, rng.randint(1, 6))
+        noise = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+        text = rng.choice(["\n", " "]).join(lines + [noise])
+        expected = legacy_extract_features_from_text(text)
+        got = parse_features_text(text)
+        if got != expected or list(got) != list(expected):
+            mismatches.append({"text": text, "expected": expected, "got": got})
+    return mismatches
+
+
+def benchmark(repeat=5, number=2000):
+    """Best-of-`repeat` microseconds per call for both parsers over the golden corpus texts."""
+    import timeit
+    texts = build_corpus_texts()
+    results = {}
+    for name, fn in (("legacy", legacy_extract_features_from_text), ("compiled", parse_features_text)):
+        timer = timeit.Timer(lambda: [fn(t) for t in texts])
+        best = min(timer.repeat(repeat=repeat, number=max(1, number // len(texts))))
+        results[name] = best / (max(1, number // len(texts)) * len(texts)) * 1e6
+    results["speedup"] = results["legacy"] / results["compiled"]
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    command = sys.argv[1] if len(sys.argv) > 1 else "check"
+    if command == "update":
+        print(f"[ocr_parser] Wrote {write_golden_corpus()} texts to {GOLDEN_CORPUS_PATH}")
+    elif command == "check":
+        mismatches = check_golden_corpus()
+        for m in mismatches[:10]:
+            print(json.dumps(m, ensure_ascii=False))
+        print(f"[ocr_parser] {len(mismatches)} mismatches")
+        sys.exit(1 if mismatches else 0)
+    elif command == "bench":
+        r = benchmark()
+        print(f"[ocr_parser] legacy {r['legacy']:.1f} us/text, compiled {r['compiled']:.1f} us/text "
+              f"({r['speedup']:.1f}x)")
+    else:
+        print("Usage: python -m src.ocr_parser [check|bench|update]")
+        sys.exit(1)
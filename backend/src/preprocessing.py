@@ -1,9 +1,9 @@
 # src/preprocessing.py
-import pandas as pd
+from __future__ import annotations
+
+# pandas and scikit-learn are imported inside the functions that need them so that
+# importing this module (and model_manager) at API startup stays cheap
 import numpy as np
-from sklearn.compose import ColumnTransformer
-from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
-from sklearn.pipeline import Pipeline
 import joblib
 import os
 
@@ -19,6 +19,7 @@ MODEL_DIR = os.path.join(os.path.dirname(__file__), "..", "models")
 os.makedirs(MODEL_DIR, exist_ok=True)
 
 def load_raw(path):
+    import pandas as pd
     df = pd.read_csv(path)
     return df
 
@@ -44,7 +45,30 @@ def basic_clean(df: pd.DataFrame) -> pd.DataFrame:
         df = df[df["duration_min"] <= 60]
     return df
 
+def clean_chunk(df: pd.DataFrame, fill_values=None) -> pd.DataFrame:
+    """
+    basic_clean for one chunk of a streamed file. Other columns (ids, names) are kept so
+    predictions can be joined back, and missing values are filled from fill_values (the
+    training medians in impute_values.joblib) rather than the chunk's own median when given.
+    Duplicates are only dropped within the chunk.
+    """
+    df = df.drop_duplicates()
+    if "duration_ms" in df.columns:
+        df = df.assign(duration_min=df["duration_ms"] / 60000.0)
+    for col in NUMERIC_FEATURES + BINARY_FEATURES + CATEGORICAL_FEATURES + ["year"]:
+        if col in df.columns and df[col].isna().any():
+            fill = (fill_values or {}).get(col)
+            df[col] = df[col].fillna(df[col].median() if fill is None else fill)
+    # Remove unrealistic durations (>60 min) outlier
+    if "duration_min" in df.columns:
+        df = df[df["duration_min"] <= 60]
+    return df
+
 def build_pipeline():
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder
+    from sklearn.pipeline import Pipeline
+
     # numeric pipeline
     numeric_transformer = Pipeline(steps=[
         ("scale", StandardScaler())
@@ -66,14 +90,16 @@ def fit_and_save_pipeline(df: pd.DataFrame, save_path=None):
     X = df_clean.drop(columns=["popularity"], errors="ignore")
     preproc = build_pipeline()
     preproc.fit(X)
+    from .artifacts import save_preprocessor
     save_path = save_path or os.path.join(MODEL_DIR, "preprocessor.joblib")
-    joblib.dump(preproc, save_path)
-    print("Saved preprocessor to", save_path)
+    fingerprint = save_preprocessor(preproc, save_path)
+    print("Saved preprocessor", fingerprint, "for", save_path)
     return preproc
 
 def load_pipeline(path=None):
+    from .artifacts import resolve_preprocessor_path
     path = path or os.path.join(MODEL_DIR, "preprocessor.joblib")
-    return joblib.load(path)
+    return joblib.load(resolve_preprocessor_path(path))
 
 def transform_df_for_model(df: pd.DataFrame, preproc=None):
     preproc = preproc or load_pipeline()
@@ -84,6 +110,7 @@ def transform_df_for_model(df: pd.DataFrame, preproc=None):
     return X_trans, df_clean
 
 def save_clean_csv(raw_csv_path, out_path="data/Spotify_clean.csv"):
+    import pandas as pd
     df = pd.read_csv(raw_csv_path)
     df_clean = basic_clean(df)
     df_clean.to_csv(out_path, index=False)
@@ -96,9 +123,9 @@ def load_impute_values(path=None):
         return joblib.load(path)
     raise FileNotFoundError(f"impute_values.joblib not found at expected path: {path}")
 
-def prepare_dataframe_from_dict(feat_dict, preprocessor=None):
+def prepare_dataframe_from_records(records, preprocessor=None):
     import pandas as pd
-    
+
     # If a preprocessor is provided, get the expected feature names from it.
     # This is the most robust way to ensure the DataFrame has the correct structure.
     if preprocessor:
@@ -107,17 +134,251 @@ def prepare_dataframe_from_dict(feat_dict, preprocessor=None):
         # Fallback to all known features if no preprocessor is passed
         expected_features = NUMERIC_FEATURES + BINARY_FEATURES + CATEGORICAL_FEATURES
 
-    # Create a dictionary for a single row, filling with defaults (0)
-    row_data = {feature: 0 for feature in expected_features}
-    
-    # Update the row with values from the input dictionary
-    for feature in expected_features:
-        if feature in feat_dict:
-            row_data[feature] = feat_dict[feature]
-            
-    df = pd.DataFrame([row_data], columns=expected_features)
+    # Build one row per record, filling missing features with defaults (0)
+    rows = [
+        [record.get(feature, 0) for feature in expected_features]
+        for record in records
+    ]
+    df = pd.DataFrame(rows, columns=expected_features)
     return df
 
+def prepare_dataframe_from_dict(feat_dict, preprocessor=None):
+    """Single-row wrapper around prepare_dataframe_from_records."""
+    return prepare_dataframe_from_records([feat_dict], preprocessor=preprocessor)
+
+
+class CompiledPreprocessor:
+    """
+    NumPy version of a fitted build_pipeline() ColumnTransformer.
+    The StandardScaler mean_/scale_, passthrough columns and one-hot categories are read
+    out of the fitted preprocessor once and applied straight into a preallocated array,
+    skipping the pandas DataFrame and sklearn's per-call validation.
+    """
+
+    def __init__(self, preprocessor):
+        from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
+
+        self.feature_names = list(preprocessor.feature_names_in_)
+        col_index = {name: i for i, name in enumerate(self.feature_names)}
+        # Each step is (kind, input column indices, output slice, params)
+        self.steps = []
+        offset = 0
+        for name, trans, cols in preprocessor.transformers_:
+            if trans == "drop" or len(cols) == 0:
+                continue
+            trans = _unwrap_single_step(trans)
+            idx = np.array([col_index[c] for c in cols], dtype=np.intp)
+            if isinstance(trans, StandardScaler):
+                mean = trans.mean_ if trans.mean_ is not None else np.zeros(len(cols))
+                scale = trans.scale_ if trans.scale_ is not None else np.ones(len(cols))
+                width = len(cols)
+                self.steps.append(("scale", idx, slice(offset, offset + width), (np.asarray(mean, dtype=float), np.asarray(scale, dtype=float))))
+            elif trans == "passthrough" or (isinstance(trans, FunctionTransformer) and trans.func is None):
+                width = len(cols)
+                self.steps.append(("passthrough", idx, slice(offset, offset + width), None))
+            elif isinstance(trans, OneHotEncoder):
+                if trans.drop is not None or getattr(trans, "sparse_output", False):
+                    raise ValueError(f"Unsupported OneHotEncoder settings in step '{name}'")
+                categories = [np.asarray(c, dtype=float) for c in trans.categories_]
+                width = sum(len(c) for c in categories)
+                self.steps.append(("onehot", idx, slice(offset, offset + width), categories))
+            else:
+                raise ValueError(f"Cannot compile transformer '{name}' of type {type(trans).__name__}")
+            offset += width
+        self.n_features_out = offset
+
+    def transform_records(self, records, out=None):
+        """Transform a list of feature dicts into the model input matrix."""
+        # Missing features default to 0, matching prepare_dataframe_from_records
+        raw = np.array(
+            [[record.get(feature, 0) for feature in self.feature_names] for record in records],
+            dtype=float,
+        ).reshape(len(records), len(self.feature_names))
+        return self.transform_array(raw, out=out)
+
+    def transform_one(self, feat_dict):
+        """Transform a single feature dict; returns a (1, n_features_out) array."""
+        return self.transform_records([feat_dict])
+
+    def transform_array(self, raw, out=None):
+        """Transform a float array whose columns follow feature_names."""
+        n_rows = raw.shape[0]
+        if out is None:
+            out = np.empty((n_rows, self.n_features_out), dtype=float)
+        for kind, idx, sl, params in self.steps:
+            block = raw[:, idx]
+            if kind == "scale":
+                mean, scale = params
+                np.subtract(block, mean, out=out[:, sl])
+                np.divide(out[:, sl], scale, out=out[:, sl])
+            elif kind == "passthrough":
+                out[:, sl] = block
+            else:
+                start = sl.start
+                for j, categories in enumerate(params):
+                    stop = start + len(categories)
+                    # Unknown categories encode as all zeros (handle_unknown="ignore")
+                    np.equal(block[:, j:j + 1], categories, out=out[:, start:stop], casting="unsafe")
+                    start = stop
+        return out
+
+
+def _unwrap_single_step(trans):
+    """Return the only step of a one-step Pipeline, or the transformer itself."""
+    from sklearn.pipeline import Pipeline
+
+    if isinstance(trans, Pipeline):
+        if len(trans.steps) != 1:
+            raise ValueError("Only single-step pipelines can be compiled")
+        return trans.steps[0][1]
+    return trans
+
+
+def _sample_records(compiled, n_samples, seed):
+    """Random feature dicts covering every compiled column, including unseen categories."""
+    rng = np.random.default_rng(seed)
+    raw = rng.normal(size=(n_samples, len(compiled.feature_names)))
+    for kind, idx, _, params in compiled.steps:
+        if kind == "scale":
+            mean, scale = params
+            raw[:, idx] = mean + raw[:, idx] * scale
+        elif kind == "passthrough":
+            raw[:, idx] = rng.integers(0, 2, size=(n_samples, len(idx)))
+        else:
+            for j, categories in enumerate(params):
+                # One extra value outside the fitted categories exercises handle_unknown
+                choices = np.append(categories, categories.max() + 1)
+                raw[:, idx[j]] = rng.choice(choices, size=n_samples)
+    return [dict(zip(compiled.feature_names, row)) for row in raw.tolist()]
+
+
+def verify_compiled_preprocessor(preprocessor, compiled, n_samples=256, seed=0, atol=1e-9):
+    """
+    Equivalence check between the compiled path and preprocessor.transform.
+    Returns the maximum absolute difference; raises AssertionError if it exceeds atol.
+    """
+    records = _sample_records(compiled, n_samples, seed)
+    expected = preprocessor.transform(prepare_dataframe_from_records(records, preprocessor=preprocessor))
+    actual = compiled.transform_records(records)
+    if expected.shape != actual.shape:
+        raise AssertionError(f"Shape mismatch: sklearn {expected.shape} vs compiled {actual.shape}")
+    max_diff = float(np.max(np.abs(np.asarray(expected, dtype=float) - actual))) if actual.size else 0.0
+    if max_diff > atol:
+        raise AssertionError(f"Compiled preprocessor differs from sklearn by {max_diff}")
+    return max_diff
+
+
+def compile_preprocessor(preprocessor, verify=True):
+    """
+    Build a CompiledPreprocessor, returning None (so callers fall back to sklearn)
+    when the pipeline layout is unsupported or the equivalence check fails.
+    """
+    try:
+        compiled = CompiledPreprocessor(preprocessor)
+        if verify:
+            verify_compiled_preprocessor(preprocessor, compiled)
+        return compiled
+    except (AssertionError, ValueError, AttributeError, KeyError) as e:
+        print(f"[Preprocessing] Falling back to sklearn transform: {e}")
+        return None
+
+
+def preprocessor_output_sources(preprocessor):
+    """
+    The raw input column behind each output column of a fitted ColumnTransformer, e.g.
+    ["tempo", ..., "key", "key", ...] with one "key" per one-hot category. Used to fold
+    per-column model attributions back onto the features the user actually supplied.
+    """
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import OneHotEncoder
+
+    sources = []
+    for name, trans, cols in preprocessor.transformers_:
+        if (isinstance(trans, str) and trans == "drop") or len(cols) == 0:
+            continue
+        # remainder columns are given by position
+        cols = [preprocessor.feature_names_in_[c] if isinstance(c, (int, np.integer)) else c for c in cols]
+        last = trans.steps[-1][1] if isinstance(trans, Pipeline) else trans
+        if isinstance(last, OneHotEncoder):
+            drop_idx = getattr(last, "drop_idx_", None)
+            for j, (col, categories) in enumerate(zip(cols, last.categories_)):
+                dropped = drop_idx is not None and drop_idx[j] is not None
+                sources.extend([col] * (len(categories) - dropped))
+        else:
+            sources.extend(cols)
+    return sources
+
+
+def preprocessor_fingerprint(preprocessor):
+    """
+    Hash of what a fitted ColumnTransformer computes: its column layout and, per step, the
+    learned arrays (scaler statistics, one-hot categories) and the few options that change
+    the output, fed in a canonical form. Everything else in the pickle (new constructor
+    parameters, private state, NumPy scalar reprs) is left out, so the same fit gets the
+    same fingerprint under any scikit-learn / NumPy version.
+    """
+    import hashlib
+    from sklearn.pipeline import Pipeline
+
+    digest = hashlib.sha256()
+
+    def feed(value):
+        if value is None or isinstance(value, (bool, np.bool_, str)):
+            digest.update(f"{type(value).__name__}:{value}".encode())
+        elif isinstance(value, (list, tuple)) or (isinstance(value, np.ndarray) and value.dtype.kind in "OUS"):
+            digest.update(b"[")
+            for item in value:
+                feed(item.item() if isinstance(item, np.generic) else item)
+            digest.update(b"]")
+        else:
+            arr = np.asarray(value)
+            arr = arr.astype(np.float64 if arr.dtype.kind in "fc" else np.int64)
+            digest.update(f"{arr.dtype.str}{arr.shape}".encode())
+            digest.update(np.ascontiguousarray(arr).tobytes())
+        digest.update(b"|")
+
+    # The input schema too: shared preprocessors must accept the same columns
+    feature_names = [str(c) for c in preprocessor.feature_names_in_]
+    feed(feature_names)
+    for name, trans, cols in preprocessor.transformers_:
+        if (isinstance(trans, str) and trans == "drop") or len(cols) == 0:
+            continue  # dropped columns don't reach the output
+        feed(name)
+        # remainder columns are given by position
+        feed([feature_names[c] if isinstance(c, (int, np.integer)) else str(c) for c in cols])
+        steps = [step for _, step in trans.steps] if isinstance(trans, Pipeline) else [trans]
+        for step in steps:
+            feed(_fitted_state(step))
+    return digest.hexdigest()[:16]
+
+
+def _fitted_state(step):
+    """The parts of one fitted transformer that determine its output (see preprocessor_fingerprint)."""
+    from sklearn.preprocessing import StandardScaler, OneHotEncoder, FunctionTransformer
+
+    if isinstance(step, str):  # "passthrough"
+        return [step]
+    if isinstance(step, FunctionTransformer) and step.func is None and not step.kw_args:
+        return ["passthrough"]  # how newer scikit-learn stores a "passthrough" step
+    name = type(step).__name__
+    if isinstance(step, StandardScaler):
+        return [name, step.with_mean, step.with_std, step.mean_, step.scale_]
+    if isinstance(step, OneHotEncoder):
+        drop_idx = step.drop_idx_
+        return [
+            name, step.handle_unknown, bool(getattr(step, "sparse_output", getattr(step, "sparse", False))),
+            np.dtype(step.dtype).str, list(step.categories_),
+            None if drop_idx is None else [None if i is None else int(i) for i in drop_idx],
+        ]
+    if isinstance(step, FunctionTransformer):
+        func = None if step.func is None else f"{step.func.__module__}.{step.func.__qualname__}"
+        return [name, func, sorted((step.kw_args or {}).items())]
+    # Anything else: its public learned attributes
+    return [name] + [
+        [attr, value] for attr, value in sorted(vars(step).items())
+        if attr.endswith("_") and not attr.startswith("_") and isinstance(value, (np.ndarray, list, tuple, int, float, str))
+    ]
+
 
 if __name__ == "__main__":
     # Quick CLI to fit pipeline
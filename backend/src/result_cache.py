@@ -0,0 +1,163 @@
+# backend/src/result_cache.py
+"""
+Bounded LRU + TTL cache for JSON-serialisable results.
+The in-memory tier is per process. An optional SQLite file acts as a shared second tier
+so several uvicorn/gunicorn workers on the same host can reuse each other's results.
+Entries carry a namespace (e.g. the model id) so they can be invalidated as a group.
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+
+def make_key(namespace, payload):
+    """Stable, compact cache key for a namespace and any repr()-able payload."""
+    digest = hashlib.blake2b(repr(payload).encode("utf-8"), digest_size=16).hexdigest()
+    return f"{namespace}:{digest}"
+
+
+class _SQLiteTier:
+    """Shared on-disk tier; one connection per thread, WAL mode for concurrent workers."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, namespace TEXT, value TEXT, expires_at REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS results_namespace ON results(namespace)")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, now):
+        row = self._connect().execute(
+            "SELECT value, expires_at FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def set(self, key, namespace, value, expires_at):
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, namespace, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, namespace, json.dumps(value), expires_at),
+            )
+
+    def invalidate(self, namespace=None):
+        with self._connect() as conn:
+            if namespace is None:
+                conn.execute("DELETE FROM results")
+            else:
+                conn.execute("DELETE FROM results WHERE namespace = ?", (namespace,))
+
+    def purge_expired(self, now):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM results WHERE expires_at <= ?", (now,))
+
+
+class ResultCache:
+    """LRU cache with a per-entry TTL and an optional shared SQLite tier."""
+
+    def __init__(self, name, max_entries=10000, ttl_seconds=3600, disk_path=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, namespace, value)
+        self._lock = threading.Lock()
+        self._disk = _SQLiteTier(disk_path) if disk_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expiry."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                if item[0] > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return item[2]
+                del self._entries[key]
+
+        if self._disk is not None:
+            try:
+                value, expires_at = self._disk.get(key, now)
+            except sqlite3.Error as e:
+                print(f"[{self.name}] Disk cache read failed: {e}")
+                value = None
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                    self._store(key, key.split(":", 1)[0], value, expires_at)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key, value, namespace=""):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._store(key, namespace, value, expires_at)
+        if self._disk is not None:
+            try:
+                self._disk.set(key, namespace, value, expires_at)
+            except sqlite3.Error as e:
+                print(f"[{self.name}] Disk cache write failed: {e}")
+
+    def _store(self, key, namespace, value, expires_at):
+        self._entries[key] = (expires_at, namespace, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, namespace=None):
+        """Drop every entry, or only those in one namespace."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+            else:
+                for key in [k for k, item in self._entries.items() if item[1] == namespace]:
+                    del self._entries[key]
+        if self._disk is not None:
+            self._disk.invalidate(namespace)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "disk": self._disk.path if self._disk is not None else None,
+            }
@@ -0,0 +1,395 @@
+# backend/src/score.py
+"""
+Offline scoring of large Spotify-style CSV catalogues with any registered model.
+The input is streamed in chunks: each chunk is cleaned like basic_clean (missing values
+are filled from the training medians in impute_values.joblib), scored with one batched
+model call and appended to the output, so memory stays flat however large the file is.
+
+With --workers N the file is split into line-aligned byte ranges (shards) that N worker
+processes score in parallel, one thread each. The model is loaded once in the parent before
+the workers fork, so they share its pages instead of each loading a copy (under spawn each
+worker loads it once). Shard outputs are merged in file order and "row" numbers the data
+rows as pandas reads them (blank lines are skipped), so rows and predictions line up with a
+single-process run. Duplicate rows are only dropped within a chunk (see clean_chunk), and a
+shard boundary also ends a chunk, so duplicates that straddle a chunk or shard boundary are
+kept; the rows dropped as duplicates can therefore differ with --workers, --shards and
+--chunksize. Without impute_values.joblib missing values fall back to per-chunk medians, which
+differ the same way. Shards are split on newlines, so fields with embedded newlines are not
+supported in sharded mode.
+
+Usage (run from the backend directory):
+    python -m src.score tracks.csv --model xgboost_regression --out predictions.csv
+    python -m src.score tracks.csv --model neuralnet_classification --out preds.parquet --keep id,name
+    python -m src.score tracks.csv --model linear_regression --out preds.csv --workers 8 --chunksize 100000
+"""
+import io
+import os
+import sys
+import time
+import shutil
+import multiprocessing
+
+DEFAULT_CHUNKSIZE = 50_000
+# Shards per worker; more shards than workers keeps every core busy until the end
+SHARDS_PER_WORKER = 4
+
+
+def load_fill_values():
+    """Training medians used to fill missing values, or None if they were not saved."""
+    from .preprocessing import load_impute_values
+    try:
+        return load_impute_values()
+    except FileNotFoundError:
+        print("[Score] impute_values.joblib not found; filling missing values with chunk medians")
+        return None
+
+
+def output_format(path, fmt=None):
+    return fmt or ("parquet" if path.endswith((".parquet", ".pq")) else "csv")
+
+
+class PredictionWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path, fmt=None):
+        self.path = path
+        self.fmt = output_format(path, fmt)
+        self._file = None
+        self._parquet = None
+        self._schema = None
+        self._empty = None
+
+    def write(self, frame):
+        if frame.empty:
+            # Every row of the chunk was dropped; kept only to write a header if no chunk has rows
+            self._empty = frame
+            return
+        self._write(frame)
+
+    def _write(self, frame):
+        if self.fmt == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise RuntimeError("Parquet output needs pyarrow (pip install pyarrow), or write a .csv")
+            table = pa.Table.from_pandas(frame, schema=self._schema, preserve_index=False)
+            if self._parquet is None:
+                self._schema = table.schema
+                self._parquet = pq.ParquetWriter(self.path, self._schema)
+            self._parquet.write_table(table)
+        else:
+            if self._file is None:
+                self._file = open(self.path, "w", newline="", encoding="utf-8")
+                frame.to_csv(self._file, index=False)
+            else:
+                frame.to_csv(self._file, index=False, header=False)
+
+    def close(self):
+        if self._parquet is None and self._file is None and self._empty is not None:
+            self._write(self._empty)
+        if self._parquet is not None:
+            self._parquet.close()
+        if self._file is not None:
+            self._file.close()
+
+
+def score_chunk(chunk, model_id, fill_values=None, keep_columns=()):
+    """Clean and score one DataFrame chunk; returns the output rows as a DataFrame."""
+    import pandas as pd
+    from .preprocessing import clean_chunk
+    from .model_manager import predict_frame, output_columns
+
+    clean = clean_chunk(chunk, fill_values)
+    if clean.empty:
+        columns = ["row"] + [c for c in keep_columns if c in clean.columns] + output_columns(model_id)
+        return pd.DataFrame(columns=columns)
+    out = pd.DataFrame({"row": clean.index.to_numpy()})
+    for col in keep_columns:
+        if col in clean.columns:
+            out[col] = clean[col].to_numpy()
+    for name, values in predict_frame(clean, model_id).items():
+        out[name] = values
+    return out
+
+
+def score_csv(input_path, model_id, output_path, chunksize=DEFAULT_CHUNKSIZE, keep_columns=(),
+              fmt=None, progress=True):
+    """Stream input_path through model_id into output_path; returns counters and timings."""
+    import pandas as pd
+    from .model_manager import get_model_entry, MODEL_CACHE
+
+    if get_model_entry(model_id) is None:
+        raise ValueError(f"Unknown model '{model_id}'")
+    MODEL_CACHE.get(model_id)  # load up front so it doesn't count against the first chunk
+    fill_values = load_fill_values()
+
+    reader = pd.read_csv(input_path, chunksize=chunksize)
+    writer = PredictionWriter(output_path, fmt)
+    rows_in = rows_out = 0
+    start = time.perf_counter()
+    try:
+        for chunk in reader:
+            scored = score_chunk(chunk, model_id, fill_values, keep_columns)
+            writer.write(scored)
+            rows_in += len(chunk)
+            rows_out += len(scored)
+            if progress:
+                elapsed = time.perf_counter() - start
+                print(f"[Score] {rows_in:,} rows read, {rows_out:,} scored ({rows_in / elapsed:,.0f} rows/s)")
+    finally:
+        writer.close()
+    elapsed = time.perf_counter() - start
+    return {
+        "model": model_id,
+        "rows_read": rows_in,
+        "rows_scored": rows_out,
+        "rows_dropped": rows_in - rows_out,
+        "seconds": elapsed,
+        "rows_per_second": rows_in / elapsed if elapsed else 0.0,
+        "output": output_path,
+    }
+
+
+class _ByteRange(io.RawIOBase):
+    """Read-only view of bytes [start, end) of a file."""
+
+    def __init__(self, path, start, end):
+        self._file = open(path, "rb")
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._remaining <= 0:
+            return 0
+        n = self._file.readinto(memoryview(buffer)[:min(len(buffer), self._remaining)])
+        self._remaining -= n
+        return n
+
+    def close(self):
+        self._file.close()
+        super().close()
+
+
+def split_csv(path, n_shards):
+    """Split the data rows of a CSV into at most n_shards line-aligned byte ranges."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        f.readline()  # header
+        data_start = f.tell()
+        bounds = [data_start]
+        for i in range(1, n_shards):
+            target = data_start + (size - data_start) * i // n_shards
+            # Move to the start of the first line that begins at or after target
+            f.seek(max(target - 1, data_start))
+            f.readline()
+            if bounds[-1] < f.tell() < size:
+                bounds.append(f.tell())
+    bounds.append(size)
+    return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+
+def count_lines(path, start, end, block_size=1 << 24):
+    """
+    Number of data rows in bytes [start, end) of a file: lines that are not empty or
+    whitespace only, which pandas skips (skip_blank_lines).
+    """
+    with _ByteRange(path, start, end) as raw:
+        reader = io.BufferedReader(raw, buffer_size=block_size)
+        return sum(1 for line in reader if not line.isspace())
+
+
+def _single_threaded(model):
+    """Limit a model to one thread so N worker processes use N cores, not N x cores."""
+    if type(model).__name__ == "Booster":
+        model.set_param({"nthread": 1})
+    elif hasattr(model, "n_jobs") and hasattr(model, "set_params"):
+        model.set_params(n_jobs=1)
+
+
+_WORKER_LIMITS = None
+
+
+def _init_worker(model_id):
+    global _WORKER_LIMITS
+    from .model_manager import MODEL_CACHE
+    try:
+        from threadpoolctl import threadpool_limits
+        _WORKER_LIMITS = threadpool_limits(limits=1)  # BLAS / OpenMP pools
+    except ImportError:
+        pass
+    # Already in memory when the worker was forked from the parent; loaded once under spawn
+    _single_threaded(MODEL_CACHE.get(model_id)["model"])
+
+
+def score_shard(task):
+    """Score one byte range of the input into its own part file; runs in a worker process."""
+    import pandas as pd
+
+    start_time = time.perf_counter()
+    with _ByteRange(task["input"], task["start"], task["end"]) as raw:
+        reader = pd.read_csv(
+            io.BufferedReader(raw),
+            names=task["columns"],
+            header=None,
+            chunksize=task["chunksize"],
+        )
+        writer = PredictionWriter(task["part"], task["fmt"])
+        rows_in = rows_out = 0
+        try:
+            for chunk in reader:
+                # The chunk index counts rows within this shard; continue from the previous shards
+                chunk.index += task["first_row"]
+                scored = score_chunk(chunk, task["model"], task["fill_values"], task["keep_columns"])
+                writer.write(scored)
+                rows_in += len(chunk)
+                rows_out += len(scored)
+        finally:
+            writer.close()
+    return {
+        "shard": task["shard"],
+        "pid": os.getpid(),
+        "rows_read": rows_in,
+        "rows_scored": rows_out,
+        "seconds": time.perf_counter() - start_time,
+    }
+
+
+def merge_parts(part_paths, output_path, fmt):
+    """Concatenate shard outputs in shard order into output_path, then delete them."""
+    # A shard with no data rows (e.g. only blank lines) leaves no part file
+    part_paths = [part for part in part_paths if os.path.exists(part)]
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        # A part with no rows carries no column types; only use it if every part is empty
+        rows = [part for part in part_paths if pq.ParquetFile(part).metadata.num_rows]
+        writer = None
+        try:
+            for part in rows or part_paths[:1]:
+                part_file = pq.ParquetFile(part)
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, part_file.schema_arrow)
+                for i in range(part_file.num_row_groups):
+                    writer.write_table(part_file.read_row_group(i))
+        finally:
+            if writer is not None:
+                writer.close()
+    else:
+        with open(output_path, "wb") as out:
+            for i, part in enumerate(part_paths):
+                with open(part, "rb") as f:
+                    if i > 0:
+                        f.readline()  # every part has its own header
+                    shutil.copyfileobj(f, out, 1 << 20)
+    for part in part_paths:
+        os.remove(part)
+
+
+def score_csv_sharded(input_path, model_id, output_path, workers, chunksize=DEFAULT_CHUNKSIZE,
+                      keep_columns=(), fmt=None, n_shards=None, start_method=None):
+    """
+    Score input_path on `workers` processes. Returns overall counters plus per-worker
+    rows/s and per-shard timings.
+    """
+    import pandas as pd
+    from .model_manager import get_model_entry, MODEL_CACHE
+
+    if get_model_entry(model_id) is None:
+        raise ValueError(f"Unknown model '{model_id}'")
+    fmt = output_format(output_path, fmt)
+    if start_method is None:
+        start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    if start_method == "fork":
+        MODEL_CACHE.get(model_id)  # workers inherit the loaded model copy-on-write
+    fill_values = load_fill_values()
+    columns = list(pd.read_csv(input_path, nrows=0).columns)
+
+    start = time.perf_counter()
+    shards = split_csv(input_path, n_shards or workers * SHARDS_PER_WORKER)
+    ctx = multiprocessing.get_context(start_method)
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(model_id,)) as pool:
+        line_counts = pool.starmap(count_lines, [(input_path, s, e) for s, e in shards])
+        first_rows = [sum(line_counts[:i]) for i in range(len(shards))]
+        tasks = [
+            {
+                "shard": i, "input": input_path, "start": s, "end": e, "columns": columns,
+                "first_row": first_rows[i], "chunksize": chunksize, "model": model_id,
+                "fill_values": fill_values, "keep_columns": list(keep_columns), "fmt": fmt,
+                "part": f"{output_path}.part-{i:05d}",
+            }
+            for i, (s, e) in enumerate(shards)
+        ]
+        results = []
+        for result in pool.imap_unordered(score_shard, tasks):
+            results.append(result)
+            print(f"[Score] Shard {result['shard'] + 1}/{len(tasks)} done by worker {result['pid']}: "
+                  f"{result['rows_read']:,} rows in {result['seconds']:.1f}s")
+    merge_parts([task["part"] for task in tasks], output_path, fmt)
+    elapsed = time.perf_counter() - start
+
+    per_worker = {}
+    for result in results:
+        stats = per_worker.setdefault(result["pid"], {"shards": 0, "rows_read": 0, "seconds": 0.0})
+        stats["shards"] += 1
+        stats["rows_read"] += result["rows_read"]
+        stats["seconds"] += result["seconds"]
+    for stats in per_worker.values():
+        stats["rows_per_second"] = stats["rows_read"] / stats["seconds"] if stats["seconds"] else 0.0
+
+    rows_in = sum(r["rows_read"] for r in results)
+    rows_out = sum(r["rows_scored"] for r in results)
+    return {
+        "model": model_id,
+        "rows_read": rows_in,
+        "rows_scored": rows_out,
+        "rows_dropped": rows_in - rows_out,
+        "seconds": elapsed,
+        "rows_per_second": rows_in / elapsed if elapsed else 0.0,
+        "output": output_path,
+        "workers": per_worker,
+        "shards": sorted(results, key=lambda r: r["shard"]),
+    }
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Score a track CSV with a registered model, chunk by chunk.")
+    parser.add_argument("input", help="Spotify-style CSV with audio feature columns")
+    parser.add_argument("--model", required=True, help="Model id, e.g. xgboost_regression")
+    parser.add_argument("--out", required=True, help="Output path (.csv or .parquet)")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="Output format (default: from --out)")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Rows per chunk")
+    parser.add_argument("--keep", default="", help="Comma-separated input columns to copy to the output")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (1 = score in this process)")
+    parser.add_argument("--shards", type=int, help=f"Input shards (default: {SHARDS_PER_WORKER} per worker)")
+    parser.add_argument("--start-method", choices=["fork", "spawn", "forkserver"],
+                        help="Worker start method (default: fork where available)")
+    args = parser.parse_args(argv)
+
+    keep_columns = [c.strip() for c in args.keep.split(",") if c.strip()]
+    try:
+        if args.workers > 1:
+            stats = score_csv_sharded(args.input, args.model, args.out, args.workers, chunksize=args.chunksize,
+                                      keep_columns=keep_columns, fmt=args.format, n_shards=args.shards,
+                                      start_method=args.start_method)
+        else:
+            stats = score_csv(args.input, args.model, args.out, chunksize=args.chunksize,
+                              keep_columns=keep_columns, fmt=args.format)
+    except (ValueError, RuntimeError) as e:
+        print(f"[Score] {e}")
+        return 1
+    for pid, worker in sorted(stats.get("workers", {}).items()):
+        print(f"[Score] Worker {pid}: {worker['shards']} shards, {worker['rows_read']:,} rows, "
+              f"{worker['rows_per_second']:,.0f} rows/s")
+    print(f"[Score] Wrote {stats['rows_scored']:,} predictions to {stats['output']} "
+          f"({stats['rows_dropped']:,} rows dropped by cleaning) in {stats['seconds']:.1f}s, "
+          f"{stats['rows_per_second']:,.0f} rows/s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
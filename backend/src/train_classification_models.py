@@ -15,6 +15,8 @@ from tensorflow.keras import layers, callbacks
 
 # Since this script is now inside the 'src' package, we can use a relative import.
 from .preprocessing import basic_clean, build_pipeline
+from .nn_engine import export_dense_weights, get_weights_path
+from .artifacts import save_preprocessor, write_manifest
 
 # --- Configuration ---
 # The BASE_DIR calculation needs to go up one more level ('..') because the file is deeper in the directory structure.
@@ -61,7 +63,8 @@ def train_xgboost_classifier(X_train, X_test, y_train, y_test, preprocessor):
 
     # Save artifacts
     joblib.dump(model, os.path.join(model_dir, "model_xg_c.joblib"))
-    joblib.dump(preprocessor, os.path.join(model_dir, "preprocessor_xg_c.joblib"))
+    save_preprocessor(preprocessor, os.path.join(model_dir, "preprocessor_xg_c.joblib"))
+    write_manifest(model_dir)
     print("✅ XGBoost Classifier model and preprocessor saved.")
 
 
@@ -95,7 +98,8 @@ def train_random_forest_classifier(X_train, X_test, y_train, y_test, preprocesso
 
     # Save artifacts
     joblib.dump(model, os.path.join(model_dir, "model_rf_c.joblib"))
-    joblib.dump(preprocessor, os.path.join(model_dir, "preprocessor_rf_c.joblib"))
+    save_preprocessor(preprocessor, os.path.join(model_dir, "preprocessor_rf_c.joblib"))
+    write_manifest(model_dir)
     print("✅ Random Forest Classifier model and preprocessor saved.")
 
 
@@ -172,8 +176,11 @@ def train_neural_network_classifier(X_train, X_test, y_train, y_test, preprocess
     plt.close()
 
     # Save artifacts
-    joblib.dump(preprocessor, os.path.join(model_dir, "preprocessor_nn_c.joblib"))
+    # Export the weights so the API can serve this model with NumPy instead of TensorFlow
+    export_dense_weights(best_model, get_weights_path(checkpoint_path))
+    save_preprocessor(preprocessor, os.path.join(model_dir, "preprocessor_nn_c.joblib"))
     joblib.dump(label_encoder, os.path.join(model_dir, "label_encoder.joblib"))
+    write_manifest(model_dir)
     print(f"✅ Neural Network Classifier model saved to {checkpoint_path}.")
     print("✅ Neural Network preprocessor and label encoder saved.")
 
@@ -13,6 +13,8 @@ from tensorflow.keras import layers, callbacks
 
 # Since this script is now inside the 'src' package, we can use a relative import.
 from .preprocessing import basic_clean, build_pipeline
+from .nn_engine import export_dense_weights, get_weights_path
+from .artifacts import save_preprocessor, write_manifest
 
 # --- Configuration ---
 # The BASE_DIR calculation needs to go up one more level ('..') because the file is deeper in the directory structure.
@@ -46,7 +48,8 @@ def train_xgboost_regressor(X_train, X_test, y_train, y_test, preprocessor):
 
     # Save artifacts
     joblib.dump(model, os.path.join(model_dir, "model_xg_r.joblib"))
-    joblib.dump(preprocessor, os.path.join(model_dir, "preprocessor_xg_r.joblib"))
+    save_preprocessor(preprocessor, os.path.join(model_dir, "preprocessor_xg_r.joblib"))
+    write_manifest(model_dir)
     print("✅ XGBoost Regressor model and preprocessor saved.")
 
 
@@ -69,7 +72,8 @@ def train_random_forest_regressor(X_train, X_test, y_train, y_test, preprocessor
 
     # Save artifacts
     joblib.dump(model, os.path.join(model_dir, "model_rf_r.joblib"))
-    joblib.dump(preprocessor, os.path.join(model_dir, "preprocessor_rf_r.joblib"))
+    save_preprocessor(preprocessor, os.path.join(model_dir, "preprocessor_rf_r.joblib"))
+    write_manifest(model_dir)
     print("✅ Random Forest Regressor model and preprocessor saved.")
 
 
@@ -115,8 +119,12 @@ def train_neural_network_regressor(X_train, X_test, y_train, y_test, preprocesso
     preds = best_model.predict(X_test).flatten()
     print(f"MAE: {mean_absolute_error(y_test, preds):.3f}, R2: {r2_score(y_test, preds):.3f}")
 
+    # Export the weights so the API can serve this model with NumPy instead of TensorFlow
+    export_dense_weights(best_model, get_weights_path(checkpoint_path))
+
     # Save preprocessor
-    joblib.dump(preprocessor, os.path.join(model_dir, "preprocessor_nn_r.joblib"))
+    save_preprocessor(preprocessor, os.path.join(model_dir, "preprocessor_nn_r.joblib"))
+    write_manifest(model_dir)
     print(f"✅ Neural Network Regressor model saved to {checkpoint_path}.")
     print("✅ Neural Network preprocessor saved.")
 
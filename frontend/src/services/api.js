@@ -35,6 +35,25 @@ export const api = {
     }
   },
 
+  // axes: [{ feature, start, stop, steps }] or [{ feature, values }], one or two entries
+  sweep: async (modelId, features, axes) => {
+    const formData = new FormData();
+    formData.append('model_id', modelId);
+    formData.append('features', JSON.stringify(features));
+    formData.append('axes', JSON.stringify(axes));
+    const response = await axios.post(`${API_URL}/predict/sweep`, formData);
+    return response.data;
+  },
+
+  // Per-feature contributions (tree models only); features may be one object or an array
+  explain: async (modelId, features) => {
+    const formData = new FormData();
+    formData.append('model_id', modelId);
+    formData.append('features', JSON.stringify(features));
+    const response = await axios.post(`${API_URL}/explain`, formData);
+    return Array.isArray(features) ? response.data.explanations : response.data.explanation;
+  },
+
   getEvaluationMetrics: async () => {
     const response = await axios.get('/evaluation_metrics.json');
     return response.data;